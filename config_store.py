@@ -0,0 +1,187 @@
+"""
+Config validation and persistence.
+
+The bridge swaps APP_CONFIG in memory as soon as an update validates, then
+hands the new dict to ConfigWriter. The writer thread waits until updates
+have been quiet for `delay` seconds (a slider drag becomes one write) and
+replaces config.json atomically: temp file in the same directory, fsync,
+os.replace. A crash mid-write leaves the previous file intact.
+"""
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from devices import validate_devices
+from session_health import validate_rpc_policy
+
+NUMERIC_KEYS = ("sensitivity", "deadzone", "gamma", "shutdown_timeout")
+SPIN_AXES = ("x", "y", "z")
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def validate_config(config):
+    """Raise ValueError if config can't drive the bridge. Unknown keys are allowed."""
+    if not isinstance(config, dict):
+        raise ValueError("config must be an object")
+    for key in NUMERIC_KEYS:
+        value = config.get(key)
+        # Older configs (and the config UI) still write {"translation": .., "rotation": ..}
+        if key == "sensitivity" and isinstance(value, dict):
+            if not all(_is_number(v) for v in value.values()):
+                raise ValueError("sensitivity.translation and sensitivity.rotation must be numbers")
+            continue
+        if value is not None and not _is_number(value):
+            raise ValueError(f"{key} must be a number")
+    if config.get("gamma") is not None and config["gamma"] <= 0:
+        raise ValueError("gamma must be positive")
+    if config.get("deadzone") is not None and config["deadzone"] < 0:
+        raise ValueError("deadzone must not be negative")
+    if config.get("spin_axis", "z") not in SPIN_AXES:
+        raise ValueError(f"spin_axis must be one of {', '.join(SPIN_AXES)}")
+    buttons = config.get("buttons", {})
+    if not isinstance(buttons, dict) or not all(isinstance(b, dict) for b in buttons.values()):
+        raise ValueError("buttons must map button ids to objects")
+    validate_devices(config)
+    validate_rpc_policy(config)
+    listeners = config.get("local_listeners") or {}
+    if not isinstance(listeners, dict) or not isinstance(listeners.get("unix", False), (bool, str)):
+        raise ValueError("local_listeners must be an object; unix is true or a socket path")
+    port = listeners.get("port")
+    if port is not None and (isinstance(port, bool) or not isinstance(port, int) or not 0 < port < 65536):
+        raise ValueError("local_listeners.port must be a TCP port number")
+    base = {key: value for key, value in config.items() if key != "devices"}
+    for device in config.get("devices") or ():
+        if device.get("profile"):
+            validate_config(merge_patch(base, device["profile"]))
+
+
+def sanitize_config(config):
+    """
+    Split a config loaded from disk into the top-level keys that validate and
+    a description of the ones that don't, so one bad key doesn't cost the
+    user every other setting. The kept keys always validate together.
+    """
+    if not isinstance(config, dict):
+        raise ValueError("config must be an object")
+    clean, dropped = {}, []
+    for key, value in config.items():
+        candidate = dict(clean)
+        candidate[key] = value
+        try:
+            validate_config(candidate)
+        except ValueError as e:
+            dropped.append(f"{key} ({e})")
+        else:
+            clean = candidate
+    return clean, dropped
+
+
+def merge_patch(target, patch):
+    """
+    Apply a JSON merge patch (RFC 7386): objects merge recursively, null
+    deletes a key, anything else replaces. Returns a new object and leaves
+    target untouched; unchanged sub-objects are shared, not copied.
+    """
+    if not isinstance(patch, dict):
+        return patch
+    result = dict(target) if isinstance(target, dict) else {}
+    for key, value in patch.items():
+        if value is None:
+            result.pop(key, None)
+        else:
+            result[key] = merge_patch(result.get(key), value)
+    return result
+
+
+def changed_keys(old, new):
+    """Top-level keys whose values differ between two configs."""
+    return {key for key in old.keys() | new.keys() if old.get(key) != new.get(key)}
+
+
+def write_atomic(path, config):
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(prefix=".config-", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(config, f, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    # Persist the rename itself
+    dir_fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+
+
+class ConfigWriter:
+    """Debounced background writer. save() never blocks on disk."""
+
+    def __init__(self, path, delay=0.5):
+        self.path = path
+        self.delay = delay
+        self.writes = 0
+        self._pending = None
+        self._writing = False
+        self._last_save = 0.0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="config-writer", daemon=True)
+        self._thread.start()
+
+    def save(self, config):
+        """Schedule config to be written. The dict must not be mutated afterwards (merge_patch never does)."""
+        with self._cond:
+            self._pending = config
+            self._last_save = time.monotonic()
+            self._cond.notify()
+
+    @property
+    def busy(self):
+        """True while a save is waiting out the debounce or being written."""
+        with self._cond:
+            return self._pending is not None or self._writing
+
+    def close(self, timeout=2.0):
+        """Write anything still pending and stop the thread."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._pending is None and not self._closed:
+                    self._cond.wait()
+                # Debounce: wait for a quiet period unless we are closing
+                while self._pending is not None and not self._closed:
+                    remaining = self._last_save + self.delay - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                config, self._pending = self._pending, None
+                self._writing = config is not None
+                closing = self._closed
+            if config is not None:
+                try:
+                    write_atomic(self.path, config)
+                    self.writes += 1
+                    logging.debug(f"Config saved to {self.path}")
+                except Exception as e:
+                    logging.error(f"Failed to save config: {e}")
+                finally:
+                    with self._cond:
+                        self._writing = False
+            if closing:
+                return
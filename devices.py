@@ -0,0 +1,103 @@
+"""
+Several input devices at once (config keys "devices" and "device_merge").
+
+    "devices": [
+        {"name": "spacemouse", "socket": "/var/run/spnav.sock"},
+        {"name": "puck", "socket": "/run/spnav-puck.sock", "priority": 1,
+         "profile": {"sensitivity": 0.4, "buttons": {"0": {"action": "logic", "value": "spin_90"}}}}
+    ],
+    "device_merge": "sum"
+
+Each device gets its own connection and reader thread, and its events are
+tagged with the device name. A device without "socket" uses libspnav (at
+most one); "backend": "evdev" or "hidraw" reads the device itself instead
+of spacenavd (see hid_backend.py). "profile" overrides config keys (deadzone, gamma,
+sensitivity, buttons) for that device only.
+
+DeviceMixer turns the per-device motion streams into one. It keeps the
+latest shaped and scaled axes of every device and, for each new motion
+event, returns the axes to apply, or None when the event should not move
+the camera:
+
+    sum        every device moves the camera; since each event applies a
+               delta, simultaneous deflections add up
+    priority   only the highest-priority device that is deflected
+    exclusive  the first device to be deflected keeps control until it is
+               released
+"""
+from hid_backend import BACKENDS
+
+MERGE_POLICIES = ("sum", "priority", "exclusive")
+
+ZERO = (0.0,) * 6
+
+
+def device_specs(config):
+    """Device dicts with a name each; without "devices", the single device from "spacenav_socket"."""
+    devices = config.get("devices")
+    if not devices:
+        return [{"name": "default", "socket": config.get("spacenav_socket"),
+                 "backend": config.get("backend", "spacenavd"), "path": config.get("device_path")}]
+    return [dict(d, name=d.get("name") or f"device{i}") for i, d in enumerate(devices)]
+
+
+def validate_devices(config):
+    """Raise ValueError for a malformed "devices"/"device_merge". Called from config_store.validate_config."""
+    devices = config.get("devices")
+    if devices is not None:
+        if not isinstance(devices, list) or not all(isinstance(d, dict) for d in devices):
+            raise ValueError("devices must be a list of objects")
+        names = [d["name"] for d in device_specs(config)]
+        if len(set(names)) != len(names):
+            raise ValueError("device names must be unique")
+        if sum(1 for d in devices if d.get("backend", "spacenavd") == "spacenavd" and not d.get("socket")) > 1:
+            raise ValueError("only one device can use libspnav (no socket)")
+        for d in devices:
+            if d.get("backend", "spacenavd") not in BACKENDS:
+                raise ValueError(f"device backend must be one of {', '.join(BACKENDS)}")
+            if "invert" in d and (not isinstance(d["invert"], list) or len(d["invert"]) != 6):
+                raise ValueError("device invert must list six booleans")
+            if not isinstance(d.get("profile", {}), dict) or "devices" in d.get("profile", {}):
+                raise ValueError("device profile must be an object of config overrides")
+    if config.get("backend", "spacenavd") not in BACKENDS:
+        raise ValueError(f"backend must be one of {', '.join(BACKENDS)}")
+    if config.get("device_merge", "sum") not in MERGE_POLICIES:
+        raise ValueError(f"device_merge must be one of {', '.join(MERGE_POLICIES)}")
+
+
+class DeviceMixer:
+    def __init__(self, names, policy="sum", priorities=None):
+        self.policy = policy
+        self.index = {name: i for i, name in enumerate(names)}
+        self.priorities = [(priorities or {}).get(name, 0) for name in names]
+        self.axes = [ZERO] * len(names)
+        self.owner = None  # exclusive: index of the device in control
+        self.merge = getattr(self, f"_{policy}")
+
+    def update(self, source, axes):
+        """Record `source`'s latest axes and return the merged axes, or None to skip this event."""
+        i = self.index.get(source)
+        if i is None:
+            return axes
+        self.axes[i] = axes
+        return self.merge(i)
+
+    def _sum(self, i):
+        return self.axes[i]
+
+    def _priority(self, i):
+        winner = None
+        for j, axes in enumerate(self.axes):
+            if axes != ZERO and (winner is None or self.priorities[j] > self.priorities[winner]):
+                winner = j
+        if winner is None:
+            return ZERO  # everything released: let the camera settle
+        return self.axes[i] if winner == i else None
+
+    def _exclusive(self, i):
+        owner = self.owner
+        if owner is None or self.axes[owner] == ZERO:
+            owner = self.owner = i if self.axes[i] != ZERO else None
+        if owner is None:
+            return ZERO
+        return self.axes[i] if owner == i else None
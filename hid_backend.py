@@ -0,0 +1,347 @@
+"""
+Direct device backends: read a 3Dconnexion device without spacenavd.
+
+    "devices": [{"name": "spacemouse", "backend": "evdev"}]
+    "devices": [{"name": "spacemouse", "backend": "hidraw", "path": "/dev/hidraw3"}]
+
+(or top-level "backend"/"device_path" for the single implicit device).
+Without "path" the first 3Dconnexion device found is used. Both decode
+into the same SpnavEvent model as spnav_wrapper, with spacenavd's default
+axis handling applied (y and z inverted for translation and rotation), so
+curves and sensitivity tuned on spacenavd carry over; "invert" (six
+booleans) overrides it.
+
+evdev (/dev/input/event*) goes through the kernel's HID input driver and
+works with any device it knows; a motion event is emitted per SYN_REPORT,
+buttons as they come. hidraw (/dev/hidraw*) reads the raw reports:
+
+    report 1  x, y, z (int16 LE); newer devices put all six axes here
+    report 2  rx, ry, rz
+    report 3  button bitmask
+
+Both need read access to the device node (the "input" group or a udev
+rule) and spacenavd not grabbing it. These are SpnavConnection drop-ins:
+open/close/wait_event/fileno/watch_path/shutdown, and SpnavError when the
+device is missing.
+
+    python hid_backend.py record /dev/input/event5 session.evdev
+"""
+import argparse
+import collections
+import glob
+import os
+import select
+import struct
+import sys
+import threading
+import time
+
+from spnav_wrapper import SpnavEvent, SpnavError, SPNAV_EVENT_MOTION, SPNAV_EVENT_BUTTON
+
+BACKENDS = ("spacenavd", "evdev", "hidraw")
+
+# 3Dconnexion devices: their own vendor id, or Logitech's with these products
+VENDOR_3DCONNEXION = 0x256F
+VENDOR_LOGITECH = 0x046D
+LOGITECH_PRODUCTS = range(0xC603, 0xC641)
+
+# spacenavd's defaults: y and z inverted, translation and rotation
+DEFAULT_INVERT = (False, True, True, False, True, True)
+
+# struct input_event: timeval, type, code, value
+INPUT_EVENT = struct.Struct("llHHi")
+EV_SYN, EV_KEY, EV_REL, EV_ABS = 0, 1, 2, 3
+SYN_REPORT = 0
+BTN_MISC = 0x100
+AXES = 6
+
+
+def is_3dconnexion(vendor, product):
+    return vendor == VENDOR_3DCONNEXION or (vendor == VENDOR_LOGITECH and product in LOGITECH_PRODUCTS)
+
+
+def motion_event(axes, period):
+    event = SpnavEvent()
+    event.type = SPNAV_EVENT_MOTION
+    m = event.motion
+    m.x, m.y, m.z, m.rx, m.ry, m.rz = axes
+    m.period = period
+    return event
+
+
+def button_event(bnum, press):
+    event = SpnavEvent()
+    event.type = SPNAV_EVENT_BUTTON
+    event.button.press = 1 if press else 0
+    event.button.bnum = bnum
+    return event
+
+
+class EvdevDecoder:
+    """input_event bytes -> SpnavEvents."""
+
+    def __init__(self, invert=DEFAULT_INVERT):
+        self.signs = [-1 if inv else 1 for inv in invert]
+        self.axes = [0] * AXES
+        self.dirty = False
+        self.rel_seen = set()
+        self.rel = False
+        self.last_ms = None
+        self._partial = b""
+
+    def feed(self, data):
+        if self._partial:
+            data = self._partial + data
+        usable = len(data) - len(data) % INPUT_EVENT.size
+        self._partial = data[usable:]
+        events = []
+        axes = self.axes
+        for sec, usec, ev_type, code, value in INPUT_EVENT.iter_unpack(data[:usable]):
+            if ev_type == EV_ABS or ev_type == EV_REL:
+                if code < AXES:
+                    axes[code] = value * self.signs[code]
+                    self.dirty = True
+                    if ev_type == EV_REL:
+                        self.rel = True
+                        self.rel_seen.add(code)
+            elif ev_type == EV_KEY and value != 2:  # 2 is autorepeat, not a new press
+                events.append(button_event(code - BTN_MISC if code >= BTN_MISC else code, value != 0))
+            elif ev_type == EV_SYN and code == SYN_REPORT:
+                if self.rel:
+                    # The kernel doesn't repeat a relative axis that went back to 0
+                    for i in range(AXES):
+                        if i not in self.rel_seen and axes[i]:
+                            axes[i] = 0
+                            self.dirty = True
+                    self.rel_seen.clear()
+                if self.dirty:
+                    now_ms = sec * 1000 + usec // 1000
+                    period = now_ms - self.last_ms if self.last_ms is not None else 0
+                    self.last_ms = now_ms
+                    events.append(motion_event(axes, max(period, 0)))
+                    self.dirty = False
+        return events
+
+
+class HidrawDecoder:
+    """One raw HID report -> SpnavEvents."""
+
+    def __init__(self, invert=DEFAULT_INVERT):
+        self.signs = [-1 if inv else 1 for inv in invert]
+        self.axes = [0] * AXES
+        self.buttons = 0
+        self.last = None
+
+    def _motion(self):
+        now = time.monotonic()
+        period = int((now - self.last) * 1000) if self.last is not None else 0
+        self.last = now
+        return [motion_event(self.axes, period)]
+
+    def feed(self, report):
+        if not report:
+            return []
+        report_id = report[0]
+        signs = self.signs
+        if report_id == 1 and len(report) >= 13:
+            for i, v in enumerate(struct.unpack_from("<6h", report, 1)):
+                self.axes[i] = v * signs[i]
+            return self._motion()
+        if report_id == 1 and len(report) >= 7:
+            for i, v in enumerate(struct.unpack_from("<3h", report, 1)):
+                self.axes[i] = v * signs[i]
+            return self._motion()
+        if report_id == 2 and len(report) >= 7:
+            for i, v in enumerate(struct.unpack_from("<3h", report, 1)):
+                self.axes[3 + i] = v * signs[3 + i]
+            return self._motion()
+        if report_id == 3:
+            state = int.from_bytes(report[1:], "little")
+            changed = state ^ self.buttons
+            self.buttons = state
+            events = []
+            bnum = 0
+            while changed:
+                if changed & 1:
+                    events.append(button_event(bnum, state >> bnum & 1))
+                changed >>= 1
+                bnum += 1
+            return events
+        return []
+
+
+def find_evdev():
+    import evdev
+    for path in evdev.list_devices():
+        try:
+            dev = evdev.InputDevice(path)
+        except OSError:
+            continue
+        try:
+            if is_3dconnexion(dev.info.vendor, dev.info.product):
+                return path
+        finally:
+            dev.close()
+    return None
+
+
+def find_hidraw():
+    for uevent in sorted(glob.glob("/sys/class/hidraw/hidraw*/device/uevent")):
+        try:
+            with open(uevent) as f:
+                fields = dict(line.strip().split("=", 1) for line in f if "=" in line)
+            _bus, vendor, product = fields["HID_ID"].split(":")
+        except (OSError, KeyError, ValueError):
+            continue
+        if is_3dconnexion(int(vendor, 16), int(product, 16)):
+            return "/dev/" + uevent.split("/")[4]
+    return None
+
+
+class _DeviceConnection:
+    """Base for the device-node backends; subclasses set the class attributes below."""
+    decoder_class = None
+    finder = None  # () -> device node of the first 3Dconnexion device, or None
+    device_dir = None
+    read_size = 4096
+
+    def __init__(self, path=None, invert=DEFAULT_INVERT):
+        self.path = path
+        self.invert = tuple(invert)
+        self.decoder = None
+        self._fd = None
+        self._pending = collections.deque()
+        self._poll = None
+        self._wake = None  # pipe, written by shutdown()
+        # shutdown() runs on another thread: it must not write to a pipe fd
+        # that close() has already released (the number may be reused)
+        self._wake_lock = threading.Lock()
+
+    def open(self):
+        try:
+            path = self.path or self.finder()
+        except ImportError as e:
+            raise SpnavError(f"Device discovery needs python-evdev ({e}); install it or set the device \"path\"")
+        if not path:
+            raise SpnavError("No 3Dconnexion device found")
+        try:
+            self._fd = os.open(path, os.O_RDONLY)
+        except PermissionError as e:
+            raise SpnavError(f"Failed to open {path}: {e}. Is the user in the input group (or is there a udev rule)?")
+        except OSError as e:
+            raise SpnavError(f"Failed to open {path}: {e}")
+        self.decoder = self.decoder_class(self.invert)
+        self._pending.clear()
+        # A read() on a device node can't be interrupted from another thread; poll with a wakeup pipe
+        with self._wake_lock:
+            self._wake = os.pipe()
+        self._poll = select.poll()
+        self._poll.register(self._fd, select.POLLIN)
+        self._poll.register(self._wake[0], select.POLLIN)
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+        with self._wake_lock:
+            if self._wake is not None:
+                for fd in self._wake:
+                    os.close(fd)
+                self._wake = None
+
+    def shutdown(self):
+        """Wake a wait_event() blocked in another thread; it raises SpnavError."""
+        with self._wake_lock:
+            if self._wake is not None:
+                try:
+                    os.write(self._wake[1], b"\0")
+                except OSError:
+                    pass  # pipe full: a wakeup is already pending
+
+    def wait_event(self):
+        pending = self._pending
+        while not pending:
+            ready = self._poll.poll()
+            if any(fd == self._wake[0] for fd, _ in ready):
+                raise SpnavError("Connection shut down")
+            data = os.read(self._fd, self.read_size)
+            if not data:
+                raise SpnavError("Device closed")
+            pending.extend(self.decoder.feed(data))
+        return pending.popleft()
+
+    def fileno(self):
+        return self._fd
+
+    def watch_path(self):
+        return self.path or self.device_dir
+
+
+class EvdevConnection(_DeviceConnection):
+    decoder_class = EvdevDecoder
+    read_size = INPUT_EVENT.size * 64
+    device_dir = "/dev/input"
+    finder = staticmethod(find_evdev)
+
+
+class HidrawConnection(_DeviceConnection):
+    decoder_class = HidrawDecoder
+    read_size = 64  # one report per read
+    device_dir = "/dev"
+    finder = staticmethod(find_hidraw)
+
+
+def connection(device):
+    """Connection for a device spec (see devices.py): spacenavd socket/libspnav, evdev or hidraw."""
+    import spnav_wrapper
+    backend = device.get("backend", "spacenavd")
+    if backend == "spacenavd":
+        return spnav_wrapper.SpnavConnection(device.get("socket"))
+    invert = device.get("invert", DEFAULT_INVERT)
+    if backend == "evdev":
+        return EvdevConnection(device.get("path"), invert)
+    if backend == "hidraw":
+        return HidrawConnection(device.get("path"), invert)
+    raise ValueError(f"Unknown backend {backend!r}")
+
+
+def record(path, output):
+    """Copy a device's raw input_event stream to a file (stand-in input for tools/hid_bench.py)."""
+    fd = os.open(path, os.O_RDONLY)
+    count = 0
+    try:
+        with open(output, "wb") as f:
+            while True:
+                data = os.read(fd, INPUT_EVENT.size * 64)
+                if not data:
+                    break
+                f.write(data)
+                count += len(data) // INPUT_EVENT.size
+    except KeyboardInterrupt:
+        pass
+    finally:
+        os.close(fd)
+    print(f"{count} input events written to {output}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_find = sub.add_parser("find", help="Print the 3Dconnexion evdev and hidraw nodes")
+    p_rec = sub.add_parser("record", help="Record raw input events from an evdev node until Ctrl+C")
+    p_rec.add_argument("device", nargs="?", help="/dev/input/eventN (default: first 3Dconnexion device)")
+    p_rec.add_argument("output")
+    args = parser.parse_args()
+
+    if args.command == "find":
+        print(f"evdev:  {find_evdev()}")
+        print(f"hidraw: {find_hidraw()}")
+    elif args.command == "record":
+        device = args.device or find_evdev()
+        if not device:
+            sys.exit("No 3Dconnexion device found")
+        record(device, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -11,6 +11,14 @@ DESKTOP_FILE="$HOME/.local/share/applications/spacemouse-xdesign.desktop"
 TRAY_DESKTOP_FILE="$HOME/.config/autostart/spacemouse-tray.desktop"
 SERVICE_NAME="spacemouse-bridge.service"
 SERVICE_DEST="$HOME/.config/systemd/user/$SERVICE_NAME"
+SOCKET_NAME="spacemouse-bridge.socket"
+SOCKET_DEST="$HOME/.config/systemd/user/$SOCKET_NAME"
+
+# --socket-activation: systemd holds port 8181 and starts the bridge on the first connection
+SOCKET_ACTIVATION=0
+if [ "$1" = "--socket-activation" ]; then
+    SOCKET_ACTIVATION=1
+fi
 
 echo "=== Installing $APP_NAME ==="
 echo "Detected App Directory: $APP_DIR"
@@ -43,7 +51,8 @@ Type=simple
 # Connect to the specific venv python interpreter
 ExecStart=$VENV_DIR/bin/python3 $APP_DIR/main.py
 WorkingDirectory=$APP_DIR
-Restart=always
+# on-failure, not always: a socket-activated bridge exits cleanly when idle ("idle_exit")
+Restart=on-failure
 RestartSec=2
 # Ensure GUI access for pystray (Tray Icon) if run as service, although tray usually runs separately
 Environment=PYTHONUNBUFFERED=1
@@ -61,16 +70,28 @@ ln -sf "$APP_DIR/$SERVICE_NAME" "$SERVICE_DEST"
 
 # Reload and Restart
 echo "Reloading systemd daemon..."
-systemctl --user daemon-reload
-echo "Enabling and restarting service..."
-systemctl --user enable "$SERVICE_NAME"
-systemctl --user restart "$SERVICE_NAME"
+if [ "$SOCKET_ACTIVATION" = "1" ]; then
+    ln -sf "$APP_DIR/$SOCKET_NAME" "$SOCKET_DEST"
+    systemctl --user daemon-reload
+    echo "Enabling socket activation (the bridge starts on the first connection)..."
+    systemctl --user disable "$SERVICE_NAME" 2>/dev/null || true
+    systemctl --user stop "$SERVICE_NAME" 2>/dev/null || true
+    systemctl --user enable --now "$SOCKET_NAME"
+    UNIT_NAME="$SOCKET_NAME"
+else
+    systemctl --user daemon-reload
+    echo "Enabling and restarting service..."
+    systemctl --user disable --now "$SOCKET_NAME" 2>/dev/null || true
+    systemctl --user enable "$SERVICE_NAME"
+    systemctl --user restart "$SERVICE_NAME"
+    UNIT_NAME="$SERVICE_NAME"
+fi
 
 # Check status briefly
-if systemctl --user is-active --quiet "$SERVICE_NAME"; then
-    echo "Service is ACTIVE and RUNNING."
+if systemctl --user is-active --quiet "$UNIT_NAME"; then
+    echo "$UNIT_NAME is ACTIVE."
 else
-    echo "WARNING: Service failed to start. Check 'journalctl --user -u $SERVICE_NAME'"
+    echo "WARNING: $UNIT_NAME failed to start. Check 'journalctl --user -u $UNIT_NAME'"
 fi
 
 
@@ -139,6 +160,6 @@ echo "Tray autostart configured."
 update-desktop-database "$HOME/.local/share/applications" 2>/dev/null
 
 echo "=== Installation Complete! ==="
-echo "1. Service is running."
+echo "1. Service is running (or, with --socket-activation, starts when xDesign first connects)."
 echo "2. You can launch the Config UI from your applications menu ('SpaceMouse xDesign')."
 echo "3. Tray indicator will start on next login (or you can run './venv/bin/python3 tray.py' now)."
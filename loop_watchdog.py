@@ -0,0 +1,98 @@
+"""
+Event-loop watchdog.
+
+A heartbeat task on the asyncio loop measures scheduling lag continuously.
+A small thread watches the heartbeat; when it goes quiet for longer than
+the threshold, the thread grabs the loop thread's stack. That stack shows
+which callback is blocking, e.g. press_combo's time.sleep or a synchronous
+open(). When the loop comes back, the stall is counted under the blocking
+site, kept in a short history and logged, at most once per log interval.
+"""
+import asyncio
+import collections
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+
+_THIS_FILE = os.path.abspath(__file__)
+_BRIDGE_DIR = os.path.dirname(_THIS_FILE)
+
+
+def blocking_site(frame):
+    """Innermost bridge frame of a stack as "file.py:function", else the innermost frame."""
+    innermost = None
+    while frame is not None:
+        code = frame.f_code
+        if innermost is None:
+            innermost = code
+        path = os.path.abspath(code.co_filename)
+        if os.path.dirname(path) == _BRIDGE_DIR and path != _THIS_FILE:
+            return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+        frame = frame.f_back
+    if innermost is None:
+        return "unknown"
+    return f"{os.path.basename(innermost.co_filename)}:{innermost.co_name}"
+
+
+class LoopWatchdog:
+    def __init__(self, lag_histogram, stall_counter, stall_histogram,
+                 threshold=0.1, interval=0.05, log_interval=10.0, history=20):
+        self.lag_histogram = lag_histogram
+        self.stall_counter = stall_counter      # labelled by ("site",)
+        self.stall_histogram = stall_histogram
+        self.threshold = threshold
+        self.interval = interval
+        self.log_interval = log_interval
+        self.recent = collections.deque(maxlen=history)
+        self.last_beat = time.monotonic()
+        self.loop_thread = None
+        self.pending = None   # (site, stack) captured by the watcher thread for the current stall
+        self.running = False
+        self.last_log = 0.0
+        self.suppressed = 0
+
+    async def run(self):
+        """Heartbeat; runs as a task on the loop being watched."""
+        loop = asyncio.get_running_loop()
+        self.loop_thread = threading.get_ident()
+        self.running = True
+        threading.Thread(target=self._watch, name="loop-watchdog", daemon=True).start()
+        try:
+            while True:
+                expected = loop.time() + self.interval
+                self.last_beat = time.monotonic()
+                await asyncio.sleep(self.interval)
+                lag = max(0.0, loop.time() - expected)
+                self.lag_histogram.observe(lag)
+                if lag >= self.threshold:
+                    self._stall_finished(lag)
+        finally:
+            self.running = False
+
+    def _watch(self):
+        limit = self.interval + self.threshold
+        while self.running:
+            time.sleep(self.threshold / 2)
+            if self.pending is None and time.monotonic() - self.last_beat > limit:
+                frame = sys._current_frames().get(self.loop_thread)
+                if frame is not None:
+                    self.pending = (blocking_site(frame), "".join(traceback.format_stack(frame)))
+
+    def _stall_finished(self, lag):
+        site, stack = self.pending or ("unknown", "")
+        self.pending = None
+        self.stall_counter.labels(site).inc()
+        self.stall_histogram.observe(lag)
+        self.recent.append({"time": time.time(), "duration_ms": round(lag * 1000, 1), "site": site, "stack": stack})
+
+        now = time.monotonic()
+        if now - self.last_log < self.log_interval:
+            self.suppressed += 1
+            return
+        more = f" (+{self.suppressed} more since last report)" if self.suppressed else ""
+        logging.warning(f"Event loop blocked for {lag * 1000:.0f} ms in {site}{more}\n{stack}")
+        self.last_log = now
+        self.suppressed = 0
@@ -16,6 +16,9 @@ import struct
 import struct
 import subprocess
 import webbrowser
+import itertools
+import threading
+import copy
 
 # Dependencies for math
 import numpy as np
@@ -24,6 +27,21 @@ import numpy as np
 import spnav_wrapper as spnav
 from spnav_wrapper import SPNAV_EVENT_MOTION, SPNAV_EVENT_BUTTON
 from uinput_wrapper import VirtualKeyboard
+from metrics import Registry, bucket_quantile
+from tracer import LatencyTracer, QUANTILES
+from recorder import EventRecorder, Recording, replay
+from loop_watchdog import LoopWatchdog
+from profiler import SamplingProfiler
+from config_store import ConfigWriter, validate_config, sanitize_config, merge_patch, changed_keys
+from telemetry import TelemetryHub
+from status import StatusServer, socket_path, make_socket_dir, remove_stale_socket, private_umask
+from transport import WampTransport
+from motion_thread import EventChannel, MotionThread, tune_current_thread
+from devices import DeviceMixer, device_specs
+import hid_backend
+from path_watch import PathWatch
+from session_health import SessionHealth, rpc_policy, STATES, HEALTHY
+from socket_activation import listen_fds, exit_when_idle
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -46,7 +64,52 @@ def _rand_id(len=16) -> str:
     return "".join(random.choices(string.ascii_uppercase + string.digits, k=len))
 
 # Global event queue for passing events from thread to async loop
-event_queue = asyncio.Queue()
+# (the aiohttp loop, or the motion thread's loop when that is enabled)
+event_queue = EventChannel()
+
+# ---------------------------------------------------------
+# Metrics (scraped via GET /metrics)
+# ---------------------------------------------------------
+# One writing thread per metric unless shared=True: the FRAMES_*/RPC_* ones
+# are only updated on the loop that runs process_motion, DEVICE_* per reader thread
+METRICS = Registry()
+EVENTS_INGESTED = METRICS.counter("spacemouse_events_ingested_total", "Events read from spacenavd", ("type",),
+                                  shared=True)  # every device's reader thread
+EVENTS_MOTION = EVENTS_INGESTED.labels("motion")
+EVENTS_BUTTON = EVENTS_INGESTED.labels("button")
+DEVICE_EVENTS = METRICS.counter("spacemouse_device_events_total", "Events read per input device", ("device",))
+DEVICE_CONNECTED = METRICS.gauge("spacemouse_device_connected", "1 while the device's spacenavd/evdev connection is up", ("device",))
+DEVICE_RECONNECTS = METRICS.counter("spacemouse_device_reconnects_total", "Connections re-established after being lost", ("device",))
+DEVICE_DOWNTIME = METRICS.histogram("spacemouse_device_reconnect_seconds", "Time from losing a device connection to getting it back",
+                                    ("device",), buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0))
+METRICS.gauge("spacemouse_event_queue_depth", "Events waiting in event_queue", fn=lambda: event_queue.qsize())
+RPC_RTT = METRICS.histogram("spacemouse_rpc_rtt_seconds", "Round trip of RPCs sent to the client", ("method", "property"))
+RPC_TIMEOUTS = METRICS.counter("spacemouse_rpc_timeouts_total", "client_rpc calls that timed out", ("method", "property"))
+MOTION_ERRORS = METRICS.counter("spacemouse_motion_errors_total", "process_motion calls that raised")
+FRAMES_SKIPPED = METRICS.counter("spacemouse_frames_skipped_total", "Motion events not sent to a degraded or suspended session", ("state",))
+SESSION_HEALTH = METRICS.gauge("spacemouse_sessions", "xDesign sessions by RPC health (see session_health.py)", ("state",))
+FRAMES_DROPPED = METRICS.counter("spacemouse_frames_dropped_total", "Motion events that produced no view.affine write (failed read or error)")
+WS_DROPPED = METRICS.counter("spacemouse_ws_messages_dropped_total", "Camera updates not sent because the client's write buffer was over the high-water mark",
+                             shared=True)  # send() on the main loop, send_threadsafe() on the motion thread
+FRAMES_WRITTEN = METRICS.counter("spacemouse_frames_written_total", "view.affine writes sent to clients")
+KEY_INJECTION = METRICS.histogram("spacemouse_key_injection_seconds", "Time spent in press_combo")
+LOOP_LAG = METRICS.histogram("spacemouse_event_loop_lag_seconds", "How late the asyncio loop wakes a sleeping task")
+LOOP_STALLS = METRICS.counter("spacemouse_event_loop_stalls_total", "Times the loop was blocked past the watchdog threshold", ("site",))
+LOOP_STALL_DURATION = METRICS.histogram("spacemouse_event_loop_stall_seconds", "Duration of loop stalls past the watchdog threshold",
+                                        buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0))
+METRICS.gauge("spacemouse_connected_controllers", "Open WebSocket sessions", fn=lambda: len(connected_controllers))
+METRICS.gauge("spacemouse_start_time_seconds", "Unix time the bridge started", fn=lambda: start_time)
+MOTION_LATENCY = METRICS.gauge("spacemouse_motion_stage_seconds", "Motion pipeline stage latency from the tracer", ("stage", "quantile"))
+
+# Push-based status for the tray (Unix socket, see status.py)
+STATUS = StatusServer()
+
+# Event-loop watchdog, created on startup (GET /debug/stalls)
+WATCHDOG = None
+
+# End-to-end latency tracer (GET /trace, GET /trace/summary)
+TRACER = LatencyTracer()
+_controller_seq = itertools.count()
 
 # Environment Fix for xdotool (GUI interaction)
 
@@ -71,6 +134,9 @@ CONFIG_DIR = get_config_dir()
 CONFIG_PATH = os.path.join(CONFIG_DIR, "config.json")
 CERT_FILE = os.path.join(CONFIG_DIR, "cert.pem")
 KEY_FILE = os.path.join(CONFIG_DIR, "key.pem")
+
+# Sampling profiler (profiler.start / profiler.stop RPC or SIGUSR1), writes profile-*.folded to CONFIG_DIR
+PROFILER = SamplingProfiler(CONFIG_DIR)
 DEFAULT_CONFIG = {
     "sensitivity": 1.0,
     "deadzone": 10,
@@ -187,17 +253,33 @@ def init_environment():
             os.environ["XDG_RUNTIME_DIR"] = runtime_dir
             logging.info(f"Set XDG_RUNTIME_DIR to {runtime_dir}")
 
+def load_config_file():
+    with open(CONFIG_PATH, "r") as f:
+        return json.load(f)
+
+def load_config_checked():
+    """config.json without the keys that fail validation, which are logged and left out."""
+    config, dropped = sanitize_config(load_config_file())
+    if dropped:
+        logging.error(f"Ignoring invalid settings in {CONFIG_PATH}: {'; '.join(dropped)}")
+    return config
+
 def load_config():
     if os.path.exists(CONFIG_PATH):
         try:
-            with open(CONFIG_PATH, "r") as f:
-                return json.load(f)
+            return load_config_checked()
         except Exception as e:
             logging.error(f"Failed to load config: {e}")
     return DEFAULT_CONFIG
 
 APP_CONFIG = load_config()
 
+# config.set swaps APP_CONFIG immediately; this thread persists it (debounced, atomic)
+CONFIG_WRITER = ConfigWriter(CONFIG_PATH)
+
+# Timed-out calls remembered per session, so their late replies can still be timed
+MAX_EXPIRED_RPCS = 32
+
 class Controller:
     """
     Manages the state and logic for a single connected client (xDesign session).
@@ -211,6 +293,12 @@ class Controller:
         self.id = "controller0"
         self.horizon_locked = False
         self.pending_rot_z = 0
+        self.trace_tid = next(_controller_seq)
+        self.transport = None # WampTransport, set by handle_websocket
+        self.topics = set() # Bridge topics (CONFIG_TOPIC), kept apart from the xDesign controller topic
+        self.health = SessionHealth(f"Session {self.trace_tid}")
+        self.expired_rpcs = {} # call_id -> (sent, loop) of calls that timed out, for late RTT samples
+        self.slow_frame = None # process_motion task of an unhealthy session, run outside broadcast_loop's gather
 
     async def handle_update(self, args):
         """Handle 3dx_rpc:update calls."""
@@ -219,16 +307,27 @@ class Controller:
             if "focus" in props:
                 self.focus = props["focus"]
                 logging.info(f"Client Focus changed to: {self.focus}")
+                publish_client_status()
 
     def resolve_rpc(self, call_id, result, error=None):
-        if call_id in self.in_flight_rpcs:
-            future = self.in_flight_rpcs[call_id]
-            if not future.done():
-                if error:
-                    future.set_exception(Exception(error))
+        future = self.in_flight_rpcs.pop(call_id, None)
+        if future is None:
+            expired = self.expired_rpcs.pop(call_id, None)
+            if expired:
+                # Too late for its frame, but still tells us how slow the session is
+                sent, loop = expired
+                rtt = time.perf_counter() - sent
+                if loop is asyncio.get_running_loop():
+                    self.health.observe(rtt, in_time=False)
                 else:
-                    future.set_result(result)
-            del self.in_flight_rpcs[call_id]
+                    loop.call_soon_threadsafe(self.health.observe, rtt, False)
+            return
+        # Calls made from the motion thread wait on that thread's loop
+        loop = future.get_loop()
+        if loop is asyncio.get_running_loop():
+            _settle(future, result, error)
+        else:
+            loop.call_soon_threadsafe(_settle, future, result, error)
 
     # Math Logic from spacenav-ws
     @staticmethod
@@ -280,7 +379,8 @@ class Controller:
     #     # Placeholder for XAUTHORITY discovery
     #     pass
 
-    def apply_gamma(self, val, gamma):
+    @staticmethod
+    def apply_gamma(val, gamma):
         """
         Applies non-linear response curve.
         Formula: value = sign * (|value| / max_range) ^ gamma * max_range
@@ -300,53 +400,39 @@ class Controller:
         # Denormalize
         return math.copysign(curved * MAX_RANGE, val)
 
+    @staticmethod
+    def shape_axis(val, deadzone, gamma):
+        """Deadzone, then response curve, for one raw axis value."""
+        if abs(val) < deadzone: return 0
+        return Controller.apply_gamma(val, gamma)
+
     async def process_motion(self, event):
         """Handle motion events (6-DOF)."""
-        # Get Config
-        global APP_CONFIG
-        scale_speed = APP_CONFIG.get("sensitivity", 1.0)
-        
-        # Robust handling for legacy config structure (dict vs float)
-        if isinstance(scale_speed, dict):
-            scale_speed = scale_speed.get("translation", 1.0)
+        t_start = time.monotonic_ns()
+        # Compiled config (curve table, scales), swapped whole on config changes
+        rt = RUNTIME
         
         # DEBUG: Log raw input occasionally to verify driver liveness
         if event.motion.x != 0:
              logging.debug(f"Input: {event.motion.x}")
         
-        deadzone = APP_CONFIG.get("deadzone", 10)
-        gamma = APP_CONFIG.get("gamma", 1.0)
-        
         # Raw Data
         t = event.motion
-        tx, ty, tz = t.x, t.y, t.z
-        rx, ry, rz = t.rx, t.ry, t.rz
-        
-        # Apply Deadzone & Gamma
-        def process_axis(val):
-            if abs(val) < deadzone: return 0
-            if hasattr(self, 'apply_gamma'):
-                return self.apply_gamma(val, gamma)
-            # Self-contained fallback in case helper is missing
-            MAX_RANGE = 350.0
-            norm = abs(val) / MAX_RANGE
-            if norm > 1.0: norm = 1.0
-            curved = pow(norm, gamma)
-            return math.copysign(curved * MAX_RANGE, val)
-
-        tx = process_axis(tx)
-        ty = process_axis(ty)
-        tz = process_axis(tz)
-        rx = process_axis(rx)
-        ry = process_axis(ry)
-        rz = process_axis(rz)
-        
-        # Scale Factors (tuned for xDesign)
-        # Translation: Map +/- 350 to +/- 100 units approx
-        trans_scale = (scale_speed * 0.5) / 350.0
         
-        # Rotation: Map +/- 350 to degrees
-        rot_scale = (scale_speed * 10.0) / 350.0 
+        shaped = getattr(event, "shaped", None)
+        if shaped is None:
+            # Apply Deadzone & Gamma (table lookup)
+            shape = rt.shape
+            tx, ty, tz = shape(t.x), shape(t.y), shape(t.z)
+            rx, ry, rz = shape(t.rx), shape(t.ry), shape(t.rz)
+            
+            # Scale Factors (tuned for xDesign, see RuntimeConfig)
+            trans_scale = rt.trans_scale
+            rot_scale = rt.rot_scale
+        else:
+            # Merged from several devices, each through its own profile (DeviceMixer)
+            tx, ty, tz, rx, ry, rz = shaped
+            trans_scale = rot_scale = 1.0
         
         # Use simple adaptive scale if needed
         # Note: 'dist' was from Pivot calculation which is context-dependent.
@@ -356,6 +442,7 @@ class Controller:
         
         if not self.focus:
             self.focus = True
+            on_main_loop(publish_client_status)
             
         if not self.subscribed_topic:
             # logging.debug("No subscribed topic. Ignoring motion.")
@@ -364,11 +451,21 @@ class Controller:
         try:
             # 1. Read current state
             perspective = await self.remote_read("view.perspective")
+            t_perspective = time.monotonic_ns()
+            if perspective is None and self.health.timeouts:
+                # Timed out: don't wait out two more reads for a frame that is late already
+                FRAMES_DROPPED.inc()
+                return
             affine_data = await self.remote_read("view.affine")
+            t_affine = time.monotonic_ns()
             if not affine_data: 
                 logging.warning("remote_read('view.affine') returned None")
+                FRAMES_DROPPED.inc()
                 return
             
+            model_extents = await self.remote_read("model.extents") or [0,0,0,0,0,0]
+            t_extents = time.monotonic_ns()
+            
             curr_affine = np.asarray(affine_data, dtype=np.float32).reshape(4, 4)
             
             # 2. Calculate Rotation
@@ -376,8 +473,6 @@ class Controller:
             U, _, Vt = np.linalg.svd(R_cam)
             R_cam = U @ Vt
             
-            model_extents = await self.remote_read("model.extents") or [0,0,0,0,0,0]
-            
             # Pivot calc
             min_pt = np.array(model_extents[0:3], dtype=np.float32)
             max_pt = np.array(model_extents[3:6], dtype=np.float32)
@@ -433,10 +528,23 @@ class Controller:
             pivot_pos, pivot_neg = self.get_affine_pivot_matrices(model_extents)
             new_affine = trans_delta @ curr_affine @ (pivot_neg @ rot_delta @ pivot_pos)
             
+            t_compute = time.monotonic_ns()
+            
             await self.remote_write("motion", True)
+            t_motion = time.monotonic_ns()
             await self.remote_write("view.affine", new_affine.reshape(-1).tolist())
+            t_written = time.monotonic_ns()
+            FRAMES_WRITTEN.inc()
+            
+            # Synthetic events (spin_90) carry no ingest stamp
+            t_ingest = getattr(event, "t_ingest", None)
+            if t_ingest is not None:
+                TRACER.record((t_ingest, event.t_dequeue, t_start, t_perspective, t_affine, t_extents,
+                               t_compute, t_motion, t_written), self.trace_tid)
 
         except Exception as e:
+            MOTION_ERRORS.inc()
+            FRAMES_DROPPED.inc()
             logging.error(f"Motion Error: {e}")
 
     async def remote_read(self, property_name):
@@ -448,23 +556,24 @@ class Controller:
         is_press = event.button.press != 0
         logging.info(f"Button Event: ID={bnum}, Press={is_press}")
 
-        button_id_str = str(bnum)
-        buttons_config = APP_CONFIG.get("buttons", {})
+        binding = RUNTIME.for_device(getattr(event, "source", None)).buttons.get(bnum)
         
-        if button_id_str in buttons_config:
-            b_conf = buttons_config[button_id_str]
-            action = b_conf.get("action")
-            value = b_conf.get("value")
+        if binding:
+            action, value = binding
             
             if action == "key" and is_press:
                 # Use Virtual Keyboard
                 if vkab:
+                     t0 = time.perf_counter()
                      vkab.press_combo(value)
+                     KEY_INJECTION.observe(time.perf_counter() - t0)
                      logging.info(f"Button {bnum}: Key {value}")
                 
             elif action == "modifier":
                 if vkab:
+                     t0 = time.perf_counter()
                      vkab.press_combo(value)
+                     KEY_INJECTION.observe(time.perf_counter() - t0)
                      logging.info(f"Button {bnum}: Modifier {value}")
                 
             elif action == "logic" and is_press:
@@ -484,7 +593,11 @@ class Controller:
                             x=0; y=0; z=0; rx=0; ry=0; rz=0
                         motion = Motion()
                     
-                    await self.process_motion(DummyEvent())
+                    if MOTION_THREAD:
+                        # Keep all camera writes on the motion thread
+                        asyncio.run_coroutine_threadsafe(self.process_motion(DummyEvent()), MOTION_THREAD.loop)
+                    else:
+                        await self.process_motion(DummyEvent())
 
 
 
@@ -506,9 +619,10 @@ class Controller:
 
     async def remote_write(self, property_name, value):
         # spacenav-ws uses "self:update" NOT "self:write"
-        return await self.client_rpc("self:update", property_name, value)
+        # Camera writes are superseded by the next frame, so they may be dropped under backpressure
+        return await self.client_rpc("self:update", property_name, value, droppable=True)
 
-    async def client_rpc(self, method, *args):
+    async def client_rpc(self, method, *args, droppable=False):
         """
         Execute an RPC on the client.
         We emulate spacenav-ws structure exactly.
@@ -529,24 +643,214 @@ class Controller:
         
         # Wrap in Event: [8, topic, payload]
         event_msg = [WAMP_EVENT, self.subscribed_topic, call_msg]
+        prop = args[0] if args else ""
+        
+        send = self.transport.send if loop is main_loop else self.transport.send_threadsafe
         
         try:
             # logging.debug(f"RPC OUT: {event_msg}")
-            await self.ws.send_str(json.dumps(event_msg))
-            result = await asyncio.wait_for(future, timeout=0.5)
+            sent = time.perf_counter()
+            if not send(json.dumps(event_msg), droppable):
+                # Client isn't reading; don't wait out the timeout for a reply that can't come
+                self.in_flight_rpcs.pop(call_id, None)
+                return None
+            policy = RUNTIME.rpc
+            result = await asyncio.wait_for(future, timeout=self.health.timeout(policy))
+            rtt = time.perf_counter() - sent
+            RPC_RTT.labels(method, prop).observe(rtt)
+            self.health.observe(rtt)
             # logging.debug(f"RPC RES: {result}")
             return result
         except asyncio.TimeoutError:
             # logging.debug(f"RPC Timed out: {method}")
-            if call_id in self.in_flight_rpcs:
-                del self.in_flight_rpcs[call_id]
+            RPC_TIMEOUTS.labels(method, prop).inc()
+            if self.in_flight_rpcs.pop(call_id, None) is not None:
+                expired = self.expired_rpcs
+                if len(expired) >= MAX_EXPIRED_RPCS:
+                    del expired[next(iter(expired))]
+                expired[call_id] = (sent, loop)
+            self.health.timed_out(policy)
             return None
         except Exception as e:
             logging.error(f"RPC Failed ({method}): {e}")
-            if call_id in self.in_flight_rpcs:
-                del self.in_flight_rpcs[call_id]
+            self.in_flight_rpcs.pop(call_id, None)
             return None
 
+
+def _settle(future, result, error):
+    if not future.done():
+        if error:
+            future.set_exception(Exception(error))
+        else:
+            future.set_result(result)
+
+
+def on_main_loop(callback, *args):
+    """Run callback on the aiohttp loop: directly if we are on it, else scheduled from the motion thread."""
+    if asyncio.get_running_loop() is main_loop:
+        callback(*args)
+    else:
+        main_loop.call_soon_threadsafe(callback, *args)
+
+# ---------------------------------------------------------
+# Runtime Config
+# ---------------------------------------------------------
+
+AXIS_RANGE = 350
+
+class RuntimeConfig:
+    """
+    APP_CONFIG compiled for the motion and button paths. Each section is
+    built from a few config keys; on a change only the sections whose keys
+    changed are rebuilt, into a new object that replaces RUNTIME whole.
+    """
+    SECTIONS = {
+        "curve": ("deadzone", "gamma"),
+        "scales": ("sensitivity",),
+        "buttons": ("buttons",),
+        "profiles": ("devices", "deadzone", "gamma", "sensitivity", "buttons"),
+        "mixer": ("devices", "device_merge"),
+        "rpc": ("rpc_timeout",),
+    }
+
+    def __init__(self, config):
+        for section in self.SECTIONS:
+            getattr(self, f"_compile_{section}")(config)
+
+    def updated(self, config, changed):
+        """Copy of self with the sections depending on `changed` keys rebuilt."""
+        new = copy.copy(self)
+        for section, keys in self.SECTIONS.items():
+            if changed.intersection(keys):
+                getattr(new, f"_compile_{section}")(config)
+        return new
+
+    def _compile_curve(self, config):
+        # Deadzone + gamma for every raw value; the curve clamps beyond full scale anyway
+        deadzone = config.get("deadzone", 10)
+        gamma = config.get("gamma", 1.0)
+        self.curve = [Controller.shape_axis(v, deadzone, gamma) for v in range(-AXIS_RANGE, AXIS_RANGE + 1)]
+
+    def _compile_scales(self, config):
+        scale_speed = config.get("sensitivity", 1.0)
+        # Robust handling for legacy config structure (dict vs float)
+        if isinstance(scale_speed, dict):
+            scale_speed = scale_speed.get("translation", 1.0)
+        # Translation: Map +/- 350 to +/- 100 units approx
+        self.trans_scale = (scale_speed * 0.5) / 350.0
+        # Rotation: Map +/- 350 to degrees
+        self.rot_scale = (scale_speed * 10.0) / 350.0
+
+    def _compile_buttons(self, config):
+        buttons = {}
+        for bid, b_conf in config.get("buttons", {}).items():
+            try:
+                buttons[int(bid)] = (b_conf.get("action"), b_conf.get("value"))
+            except ValueError:
+                logging.warning(f"Ignoring button mapping with non-numeric id {bid!r}")
+        self.buttons = buttons
+
+    def _compile_profiles(self, config):
+        # Per-device overrides, each compiled like the top-level config
+        base = {key: value for key, value in config.items() if key != "devices"}
+        self.profiles = {d["name"]: RuntimeConfig(merge_patch(base, d["profile"]))
+                         for d in device_specs(config) if d.get("profile")}
+
+    def _compile_mixer(self, config):
+        # Only with "devices" configured; the implicit single device needs no merging
+        if not config.get("devices"):
+            self.mixer = None
+            return
+        specs = device_specs(config)
+        self.mixer = DeviceMixer([d["name"] for d in specs], config.get("device_merge", "sum"),
+                                 {d["name"]: d.get("priority", 0) for d in specs})
+
+    def _compile_rpc(self, config):
+        self.rpc = rpc_policy(config)
+
+    def for_device(self, name):
+        return self.profiles.get(name, self)
+
+    def scaled(self, m):
+        """Shaped and scaled axes of a motion event, as process_motion would apply them."""
+        shape, ts, rs = self.shape, self.trans_scale, self.rot_scale
+        return (shape(m.x) * ts, shape(m.y) * ts, shape(m.z) * ts,
+                shape(m.rx) * rs, shape(m.ry) * rs, shape(m.rz) * rs)
+
+    def shape(self, val):
+        if val > AXIS_RANGE:
+            val = AXIS_RANGE
+        elif val < -AXIS_RANGE:
+            val = -AXIS_RANGE
+        return self.curve[int(val) + AXIS_RANGE]
+
+RUNTIME = RuntimeConfig(APP_CONFIG)
+
+# Live axis feed for the config UI (GET /telemetry); publishing is skipped while nobody listens
+TELEMETRY = TelemetryHub(lambda v: RUNTIME.shape(v))
+
+# UI sessions SUBSCRIBE here to receive config changes: [8, CONFIG_TOPIC, {"changed": [...], "patch": {...}}]
+CONFIG_TOPIC = "bridge:config"
+
+def apply_config(new_conf):
+    """Validate and swap in a new config, recompiling only what changed. Returns the changed keys."""
+    global APP_CONFIG, RUNTIME
+    validate_config(new_conf)
+    changed = changed_keys(APP_CONFIG, new_conf)
+    if changed:
+        RUNTIME = RUNTIME.updated(new_conf, changed)
+        APP_CONFIG = new_conf
+    return changed
+
+def publish_config_change(changed, origin=None):
+    """Send the changed keys to every session subscribed to CONFIG_TOPIC, except the one that made the change."""
+    if not changed:
+        return
+    payload = json.dumps([WAMP_EVENT, CONFIG_TOPIC, {
+        "changed": sorted(changed),
+        "patch": {key: APP_CONFIG.get(key) for key in changed},
+    }])
+    for ws, ctrl in connected_controllers.items():
+        if ws is not origin and CONFIG_TOPIC in ctrl.topics:
+            ctrl.transport.send(payload)
+
+async def watch_config_file(interval=2.0):
+    """
+    Pick up edits made to config.json outside the bridge. Nothing is reloaded
+    while CONFIG_WRITER has a save pending or in progress: the file is then
+    older than APP_CONFIG and would revert it. Once that write lands it
+    compares equal.
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        last_mtime = os.stat(CONFIG_PATH).st_mtime_ns
+    except OSError:
+        last_mtime = None
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            mtime = os.stat(CONFIG_PATH).st_mtime_ns
+        except OSError:
+            continue
+        if mtime == last_mtime:
+            continue
+        if CONFIG_WRITER.busy:
+            continue
+        last_mtime = mtime
+        try:
+            new_conf = await loop.run_in_executor(None, load_config_checked)
+            # A config.set may have come in while the file was being read
+            if CONFIG_WRITER.busy:
+                last_mtime = None
+                continue
+            changed = apply_config(new_conf)
+        except (OSError, ValueError) as e:
+            logging.warning(f"Ignoring invalid {CONFIG_PATH}: {e}")
+            continue
+        if changed:
+            logging.info(f"Config file changed: {', '.join(sorted(changed))}")
+            publish_config_change(changed)
+
 # ---------------------------------------------------------
 # WebSocket / WAMP Logic
 # ---------------------------------------------------------
@@ -554,6 +858,63 @@ class Controller:
 connected_controllers = {} # websocket -> Controller
 start_time = time.time()
 
+# xDesign polls these every few seconds; the answer never changes, so the
+# body and headers are built once instead of per request.
+PROBE_BODY = json.dumps({"port": 8181, "version": "1.4.8.21486"}).encode("utf-8")
+PROBE_HEADERS = (
+    ("Content-Type", "application/json"),
+    ("Access-Control-Allow-Methods", "GET, POST, OPTIONS"),
+    ("Access-Control-Allow-Headers", "*"),
+    ("Access-Control-Allow-Private-Network", "true"),
+)
+
+def publish_client_status():
+    """xDesign sessions (config UI tabs don't count) and whether any has focus."""
+    sessions = [c for c in connected_controllers.values() if c.subscribed_topic]
+    STATUS.update(clients=len(sessions), focus=any(c.focus for c in sessions))
+
+def _window_median_ms(family, previous):
+    """Median (ms) of the samples observed since the `previous` bucket counts; also returns the current counts."""
+    counts = family.bucket_counts()
+    if not counts:
+        return None, counts
+    previous = previous or [0] * len(counts)
+    median = bucket_quantile(family.buckets, [a - b for a, b in zip(counts, previous)], 0.5)
+    return (round(median * 1000.0, 2) if median is not None else None), counts
+
+async def status_refresh(interval=1.0):
+    """
+    Counters change too often to push on every increment; sample them instead.
+    "perf" covers the last interval: input rate, median RPC round trip,
+    frames dropped and median key-injection time.
+    """
+    last_motion = EVENTS_MOTION.value
+    last_events = EVENTS_INGESTED.total()
+    last_dropped = FRAMES_DROPPED.value
+    rtt_counts = RPC_RTT.bucket_counts()
+    key_counts = KEY_INJECTION.bucket_counts()
+    while True:
+        await asyncio.sleep(interval)
+        motion = EVENTS_MOTION.value
+        events = EVENTS_INGESTED.total()
+        dropped = FRAMES_DROPPED.value
+        rtt_ms, rtt_counts = _window_median_ms(RPC_RTT, rtt_counts)
+        key_ms, key_counts = _window_median_ms(KEY_INJECTION, key_counts)
+        health = [c.health.state for c in tuple(connected_controllers.values()) if c.subscribed_topic]
+        for state in STATES:
+            SESSION_HEALTH.labels(state).set(health.count(state))
+        STATUS.update(motion=motion != last_motion, unhealthy=len(health) - health.count(HEALTHY), errors={
+            "rpc_timeouts": RPC_TIMEOUTS.total(),
+            "motion_errors": MOTION_ERRORS.total(),
+            "loop_stalls": LOOP_STALLS.total(),
+        }, perf={
+            "event_rate": round((events - last_events) / interval, 1),
+            "rtt_ms": rtt_ms,
+            "dropped": dropped - last_dropped,
+            "key_ms": key_ms,
+        })
+        last_motion, last_events, last_dropped = motion, events, dropped
+
 async def handle_options(request):
     """
     Handle CORS Preflight / Private Network Access (PNA)
@@ -584,30 +945,82 @@ async def handle_config(request):
     except Exception as e:
         return web.Response(text=f"Error: {e}", status=500)
 
+async def handle_metrics(request):
+    """Prometheus text exposition of the bridge metrics"""
+    for stage, percentiles in TRACER.summary().items():
+        if stage == "frames":
+            continue
+        for q in QUANTILES:
+            MOTION_LATENCY.labels(stage, str(q)).set(percentiles[f"p{int(q * 100)}"] / 1000.0)
+    return web.Response(body=METRICS.render().encode("utf-8"),
+                        headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
+
+async def handle_trace(request):
+    """Recorded motion frames as Chrome trace-event JSON (chrome://tracing, Perfetto)"""
+    return web.json_response(TRACER.chrome_trace(), headers={
+        "Content-Disposition": f"attachment; filename=spacemouse-trace-{int(time.time())}.json"
+    })
+
+async def handle_trace_summary(request):
+    """p50/p95/p99 per motion stage, in milliseconds"""
+    return web.json_response(TRACER.summary())
+
+async def handle_stalls(request):
+    """Recent event-loop stalls with the blocking stack"""
+    return web.json_response(list(WATCHDOG.recent) if WATCHDOG else [])
+
+async def handle_telemetry(request):
+    """Server-sent events: ?rate=<frames/s>&batch=<frames per message>, see telemetry.py"""
+    try:
+        rate = float(request.query.get("rate", 30))
+        batch = int(request.query.get("batch", 1))
+    except ValueError:
+        raise web.HTTPBadRequest(text="rate and batch must be numbers")
+    if not math.isfinite(rate):
+        raise web.HTTPBadRequest(text="rate must be a finite number")
+    resp = web.StreamResponse(headers={
+        "Content-Type": "text/event-stream",
+        "Cache-Control": "no-cache",
+        "Access-Control-Allow-Origin": request.headers.get("Origin", "*"),
+    })
+    await resp.prepare(request)
+    sub = TELEMETRY.subscribe(rate, batch)
+    try:
+        async for chunk in TELEMETRY.stream(sub):
+            await resp.write(chunk)
+    except (ConnectionResetError, RuntimeError):
+        pass # Client went away
+    finally:
+        TELEMETRY.unsubscribe(sub)
+    return resp
+
+def is_websocket_upgrade(request):
+    return request.headers.get("Upgrade", "").lower() == "websocket"
+
+async def handle_probe(request):
+    """
+    Fast path for xDesign discovery polling (GET / and GET /3dconnexion/nlproxy).
+    Answers from prebuilt bytes; monitor_middleware lets it through untouched.
+    WebSocket upgrades (which do get the middleware) and browser visits are
+    handed on.
+    """
+    headers = request.headers
+    if is_websocket_upgrade(request):
+        return await handle_websocket(request)
+
+    # Browser visiting root -> Redirect to Config
+    if request.path == "/" and "text/html" in headers.get("Accept", ""):
+        return web.HTTPFound("/config")
+
+    response = web.Response(body=PROBE_BODY, headers=PROBE_HEADERS)
+    response.headers["Access-Control-Allow-Origin"] = headers.get("Origin", "*")
+    return response
+
 async def handle_websocket(request):
     """
     Handle WebSocket connection (both WAMP and Config)
     """
-    # Check if this is a WebSocket upgrade
-    if request.headers.get("Upgrade", "").lower() != "websocket":
-        # Check if browser visiting root -> Redirect to Config
-        accept = request.headers.get("Accept", "").lower()
-        if request.path == "/" and "text/html" in accept:
-            return web.HTTPFound("/config")
-
-        # Handle standard HTTP GET probe (xDesign expects this at /)
-        logging.info(f"HTTP GET probe from {request.remote} path={request.path}")
-        data = {"port": 8181, "version": "1.4.8.21486"}
-        origin = request.headers.get("Origin", "*")
-        
-        # PNA / CORS headers for Probe
-        headers = {
-            "Content-Type": "application/json", 
-            "Access-Control-Allow-Origin": origin,
-            "Access-Control-Allow-Private-Network": "true"
-        }
-        return web.Response(text=json.dumps(data), headers=headers)
-
+    global last_activity
     ws = web.WebSocketResponse(protocols=("wamp", "3dx-v1"))
     try:
         await ws.prepare(request)
@@ -617,17 +1030,21 @@ async def handle_websocket(request):
     
     logging.info(f"New connection: {request.remote}")
     
-    global APP_CONFIG
-    
     # Create controller
     controller = Controller(ws, {})
+    tr_conf = APP_CONFIG.get("ws_transport", {})
+    transport = controller.transport = WampTransport(
+        ws, request,
+        coalesce=tr_conf.get("coalesce", True),
+        high_water=tr_conf.get("high_water_kb", 64) * 1024,
+        on_drop=WS_DROPPED.inc)
     connected_controllers[ws] = controller
     
     try:
         # 1. Send WELCOME
         session_id = _rand_id()
         # [0, sessionID, 1, ident]
-        await ws.send_str(json.dumps([WAMP_WELCOME, session_id, 1, "AntigravityBridge"]))
+        transport.send(json.dumps([WAMP_WELCOME, session_id, 1, "AntigravityBridge"]))
         
         async for msg in ws:
             logging.info(f"WS RAW: Type={msg.type} Data={msg.data!r}")
@@ -647,39 +1064,72 @@ async def handle_websocket(request):
                         
                         if "create" in proc:
                             if args and "3dmouse" in args[0]:
-                                 await ws.send_str(json.dumps([WAMP_CALLRESULT, call_id, {"connexion": "mouse0"}]))
+                                 transport.send(json.dumps([WAMP_CALLRESULT, call_id, {"connexion": "mouse0"}]))
                             elif args and "3dcontroller" in args[0]:
                                  meta = args[2] if len(args) > 2 else {}
                                  controller.client_metadata = meta
                                  logging.info(f"Client Metadata: {meta}")
-                                 await ws.send_str(json.dumps([WAMP_CALLRESULT, call_id, {"instance": "controller0"}]))
+                                 transport.send(json.dumps([WAMP_CALLRESULT, call_id, {"instance": "controller0"}]))
                         
                         elif "update" in proc:
                             await controller.handle_update(args)
-                            await ws.send_str(json.dumps([WAMP_CALLRESULT, call_id, None]))
+                            transport.send(json.dumps([WAMP_CALLRESULT, call_id, None]))
     
                         elif "config.get" in proc:
-                            await ws.send_str(json.dumps([WAMP_CALLRESULT, call_id, APP_CONFIG]))
+                            transport.send(json.dumps([WAMP_CALLRESULT, call_id, APP_CONFIG]))
     
                         elif "config.set" in proc:
                             try:
-                                new_conf = args[0]
-                                APP_CONFIG = new_conf
-                                with open(CONFIG_PATH, "w") as f:
-                                    json.dump(APP_CONFIG, f, indent=4)
+                                changed = apply_config(args[0] if args else None)
+                                CONFIG_WRITER.save(APP_CONFIG)
                                 logging.info("Config updated via RPC")
-                                await ws.send_str(json.dumps([WAMP_CALLRESULT, call_id, "OK"]))
+                                transport.send(json.dumps([WAMP_CALLRESULT, call_id, "OK"]))
+                                publish_config_change(changed, origin=ws)
                             except Exception as e:
                                 logging.error(f"Config update failed: {e}")
-                                await ws.send_str(json.dumps([WAMP_CALLERROR, call_id, str(e)]))
+                                transport.send(json.dumps([WAMP_CALLERROR, call_id, str(e)]))
+    
+                        elif "config.patch" in proc:
+                            # JSON merge patch, e.g. {"gamma": 1.4} or {"buttons": {"2": null}}
+                            try:
+                                if not args or not isinstance(args[0], dict):
+                                    raise ValueError("config.patch expects an object")
+                                changed = apply_config(merge_patch(APP_CONFIG, args[0]))
+                                if changed:
+                                    CONFIG_WRITER.save(APP_CONFIG)
+                                    logging.debug(f"Config patched via RPC: {', '.join(sorted(changed))}")
+                                transport.send(json.dumps([WAMP_CALLRESULT, call_id, {"changed": sorted(changed)}]))
+                                publish_config_change(changed, origin=ws)
+                            except Exception as e:
+                                logging.error(f"Config patch failed: {e}")
+                                transport.send(json.dumps([WAMP_CALLERROR, call_id, str(e)]))
+    
+                        elif "profiler.start" in proc:
+                            try:
+                                PROFILER.start(args[0] if args else None)
+                                transport.send(json.dumps([WAMP_CALLRESULT, call_id, {"running": True, "rate": PROFILER.rate}]))
+                            except ValueError as e:
+                                transport.send(json.dumps([WAMP_CALLERROR, call_id, str(e)]))
+    
+                        elif "profiler.stop" in proc:
+                            try:
+                                path = await asyncio.get_running_loop().run_in_executor(None, PROFILER.stop)
+                                transport.send(json.dumps([WAMP_CALLRESULT, call_id, {"path": path, "samples": PROFILER.samples}]))
+                            except OSError as e:
+                                logging.error(f"Writing profile failed: {e}")
+                                transport.send(json.dumps([WAMP_CALLERROR, call_id, str(e)]))
                             
                         else:
-                            await ws.send_str(json.dumps([WAMP_CALLRESULT, call_id, None]))
+                            transport.send(json.dumps([WAMP_CALLRESULT, call_id, None]))
     
                     elif msg_type == WAMP_SUBSCRIBE:
                         topic = data[1]
                         logging.info(f"Subscribed to: {topic}")
-                        controller.subscribed_topic = topic
+                        if topic == CONFIG_TOPIC:
+                            controller.topics.add(topic)
+                        else:
+                            controller.subscribed_topic = topic
+                            publish_client_status()
                         
                     elif msg_type == WAMP_CALLRESULT:
                         call_id = data[1]
@@ -698,8 +1148,11 @@ async def handle_websocket(request):
                 logging.error('ws connection closed with exception %s', ws.exception())
 
     finally:
+        transport.close()
+        last_activity = time.monotonic()
         if ws in connected_controllers:
             del connected_controllers[ws]
+            publish_client_status()
         logging.info("WebSocket Closed")
 
     return ws
@@ -708,33 +1161,105 @@ async def handle_websocket(request):
 # Spacenav Handler (Thread)
 # ---------------------------------------------------------
 
-def spacenav_thread_func():
-    logging.info("Spacenav thread started.")
+# Optional input recording (config key "record_path")
+event_recorder = None
+
+def open_recorder():
+    global event_recorder
+    record_path = APP_CONFIG.get("record_path")
+    if record_path:
+        try:
+            event_recorder = EventRecorder(os.path.expanduser(record_path))
+            logging.info(f"Recording input to {record_path}")
+        except Exception as e:
+            logging.error(f"Failed to open recording {record_path}: {e}")
+
+# Device name -> connected, for the status feed (main loop only)
+device_state = {}
+
+def set_device_connected(name, connected):
+    device_state[name] = connected
+    STATUS.update(spacenavd=any(device_state.values()), devices=dict(device_state))
+
+# Reconnect backoff (seconds) when no inotify event arrives; see path_watch.py
+RECONNECT_MIN = 0.25
+RECONNECT_MAX = 30.0
+# A connection must stay up this long (seconds) before the backoff starts over
+RECONNECT_STABLE = 5.0
+
+def spacenav_thread_func(device, conn):
+    name = device["name"]
+    logging.info(f"Spacenav thread started ({name}).")
+    PROFILER.register_thread(threading.current_thread().name)
+    if MOTION_THREAD:
+        mt = MOTION_THREAD
+        tune_current_thread(mt.cpu, mt.nice, mt.rt_priority)
     
-    while True:
+    device_events = DEVICE_EVENTS.labels(name)
+    
+    backend = device.get("backend", "spacenavd")
+    watch = None
+    backoff = RECONNECT_MIN
+    lost_at = None
+    last_error = None
+    
+    while not input_stop.is_set():
         # 1. Connection Loop
         connected = False
         try:
-            spnav.spnav_open()
+            conn.open()
             connected = True
-            logging.info("Connected to spacenavd.")
-        except spnav.SpnavError:
-            # logging.error("Failed to connect to spacenavd. Retrying in 2s...")
-            time.sleep(2)
-            continue
+        except spnav.SpnavError as e:
+            # Expected while the daemon or device is away; say why once, not every retry
+            if str(e) != last_error:
+                logging.warning(f"Cannot connect to {backend} ({name}): {e}")
+                last_error = str(e)
         except Exception as e:
-            logging.error(f"Unexpected error connecting to spacenavd: {e}")
-            time.sleep(2)
+            logging.error(f"Unexpected error connecting to {backend} ({name}): {e}")
+        
+        if not connected:
+            if watch is None:
+                # Watch first, then retry once: a socket created in between isn't missed
+                watch = PathWatch(conn.watch_path())
+                continue
+            if watch.wait(backoff, _input_wake[0]):
+                # Socket (re)created: give the daemon a moment to listen()
+                time.sleep(0.05)
+            else:
+                # Fallback polling; without inotify, stay near the old 2 s retry
+                backoff = min(backoff * 2, RECONNECT_MAX if watch.active else 2.0)
             continue
+        
+        if watch:
+            watch.close()
+            watch = None
+        connected_at = time.monotonic()
+        last_error = None
+        logging.info(f"Connected to {backend} ({name}).")
+        DEVICE_CONNECTED.labels(name).set(1)
+        if lost_at is not None:
+            DEVICE_RECONNECTS.labels(name).inc()
+            DEVICE_DOWNTIME.labels(name).observe(time.monotonic() - lost_at)
+        main_loop.call_soon_threadsafe(set_device_connected, name, True)
             
         # 2. Event Loop
-        while connected:
+        while connected and not input_stop.is_set():
             try:
-                event = spnav.spnav_wait_event()
+                event = conn.wait_event()
                 if event:
+                    event.t_ingest = time.monotonic_ns()
                     if event.type == SPNAV_EVENT_MOTION or event.type == SPNAV_EVENT_BUTTON:
-                        if event_queue_loop:
-                             asyncio.run_coroutine_threadsafe(event_queue.put(event), event_queue_loop)
+                        event.source = name
+                        device_events.inc()
+                        if event.type == SPNAV_EVENT_MOTION:
+                            EVENTS_MOTION.inc()
+                        else:
+                            EVENTS_BUTTON.inc()
+                        if TELEMETRY.subscribers:
+                            TELEMETRY.publish(event)
+                        if event_recorder:
+                            event_recorder.record(event)
+                        event_queue.put_nowait(event)
                 else:
                     # No event, check if connection is still alive?
                     # Since spnav_wait_event is non-blocking or blocking depending on impl,
@@ -742,32 +1267,122 @@ def spacenav_thread_func():
                     time.sleep(0.01)
 
             except Exception as e:
-                logging.error(f"Spacenav loop error: {e}. Reconnecting...")
+                if input_stop.is_set():
+                    break  # Woken by stop_input_threads
+                logging.error(f"Spacenav loop error ({name}): {e}. Reconnecting...")
+                lost_at = time.monotonic()
+                DEVICE_CONNECTED.labels(name).set(0)
+                main_loop.call_soon_threadsafe(set_device_connected, name, False)
                 try:
-                    spnav.spnav_close()
+                    conn.close()
                 except:
                     pass
                 connected = False
-                time.sleep(1)
-
-    # Should not reach here
-
-event_queue_loop = None
+                # Something that accepts and then drops us at once must not
+                # become a tight reconnect loop: back off unless it was up a while
+                if lost_at - connected_at >= RECONNECT_STABLE:
+                    backoff = RECONNECT_MIN
+                else:
+                    backoff = min(backoff * 2, RECONNECT_MAX)
+                input_stop.wait(backoff)
 
+    if watch:
+        watch.close()
+    try:
+        conn.close()
+    except Exception:
+        pass
+    DEVICE_CONNECTED.labels(name).set(0)
+    logging.info(f"Spacenav thread stopped ({name}).")
+
+# Reader threads with their connections; input_stop and _input_wake end them (stop_input_threads)
+input_threads = []
+input_stop = threading.Event()
+_input_wake = None
+
+def start_input_threads():
+    """One reader thread per configured device (see devices.py)."""
+    global _input_wake
+    _input_wake = os.pipe()
+    specs = device_specs(APP_CONFIG)
+    for device in specs:
+        set_device_connected(device["name"], False)
+        conn = hid_backend.connection(device)
+        # A single implicit device keeps the plain "spacenav" thread name
+        thread_name = "spacenav" if len(specs) == 1 else f"spacenav-{device['name']}"
+        thread = threading.Thread(target=spacenav_thread_func, args=(device, conn), name=thread_name, daemon=True)
+        input_threads.append((thread, conn))
+        thread.start()
+
+def stop_input_threads(timeout):
+    """Wake the reader threads wherever they block and join them. Returns the names of any still running."""
+    input_stop.set()
+    if _input_wake:
+        os.write(_input_wake[1], b"\0")  # never read: wakes every PathWatch wait
+    for thread, conn in input_threads:
+        conn.shutdown()
+    deadline = time.monotonic() + timeout
+    for thread, conn in input_threads:
+        thread.join(max(0.0, deadline - time.monotonic()))
+    return [thread.name for thread, conn in input_threads if thread.is_alive()]
+
+# The aiohttp loop, set by capture_loop_ref
+main_loop = None
+# Optional dedicated motion thread (config key "motion_thread")
+MOTION_THREAD = None
+
+
+async def replay_recording(options):
+    """Feed a recorded session into event_queue (config key "replay")."""
+    path = os.path.expanduser(options["path"])
+    speed = options.get("speed", 1.0)
+    recording = Recording(path).slice(options.get("start"), options.get("end"))
+    logging.info(f"Replaying {len(recording)} events from {path} (speed {speed or 'max'})")
+    while True:
+        sent = await replay(recording, event_queue, speed, TELEMETRY)
+        logging.info(f"Replay finished: {sent} events")
+        if not options.get("loop"):
+            break
 
 
 async def broadcast_loop():
     logging.info("Starting broadcast loop")
+    # On the motion thread, buttons go back to the main loop (key injection, launching the browser)
+    on_motion_thread = asyncio.get_running_loop() is not main_loop
     while True:
         event = await event_queue.get()
+        if event is None:
+            break  # on_shutdown: input has stopped
+        event.t_dequeue = time.monotonic_ns()
         # Process for ALL connected active controllers
         # (Usually only one active)
+        if event.type == SPNAV_EVENT_MOTION:
+            rt = RUNTIME
+            if rt.mixer:
+                source = getattr(event, "source", None)
+                event.shaped = rt.mixer.update(source, rt.for_device(source).scaled(event.motion))
+                if event.shaped is None:
+                    continue  # Another device has control (priority/exclusive)
         tasks = []
-        for ctrl in connected_controllers.values():
+        for ctrl in tuple(connected_controllers.values()):
             if event.type == SPNAV_EVENT_MOTION:
-                tasks.append(asyncio.create_task(ctrl.process_motion(event)))
+                # A session that stopped answering gets fewer frames (or only probes), and those
+                # aren't awaited here so they can't hold up the other sessions or the next event
+                health = ctrl.health
+                busy = ctrl.slow_frame is not None and not ctrl.slow_frame.done()
+                if busy or not health.allow_frame(RUNTIME.rpc):
+                    FRAMES_SKIPPED.labels(health.state).inc()
+                    continue
+                task = asyncio.create_task(ctrl.process_motion(event))
+                if health.state == HEALTHY:
+                    tasks.append(task)
+                else:
+                    ctrl.slow_frame = task
             elif event.type == SPNAV_EVENT_BUTTON:
-                 tasks.append(asyncio.create_task(ctrl.process_button(event)))
+                if on_motion_thread:
+                    asyncio.run_coroutine_threadsafe(ctrl.process_button(event), main_loop)
+                else:
+                    tasks.append(asyncio.create_task(ctrl.process_button(event)))
         
         if tasks:
             await asyncio.gather(*tasks)
@@ -800,32 +1415,120 @@ def ensure_ssl_certs(cert_file, key_file):
             raise
 
 
+def create_event_loop(backend):
+    """
+    Event loop for the bridge (config key "loop"): "auto" uses uvloop when it
+    is installed, "uvloop" asks for it and warns if missing, "asyncio" is the
+    stdlib loop. See requirements-perf.txt.
+    """
+    if backend in ("auto", "uvloop"):
+        try:
+            import uvloop
+            logging.info(f"Event loop: uvloop {uvloop.__version__}")
+            return uvloop.new_event_loop()
+        except ImportError:
+            if backend == "uvloop":
+                logging.warning("uvloop requested but not installed, using the asyncio loop")
+    elif backend != "asyncio":
+        logging.warning(f"Unknown loop backend {backend!r}, using the asyncio loop")
+    logging.info("Event loop: asyncio")
+    return asyncio.new_event_loop()
+
+
+def toggle_profiler():
+    if not PROFILER.running:
+        PROFILER.start()
+    else:
+        # Writing the profile is file I/O, keep it off the loop
+        asyncio.get_running_loop().run_in_executor(None, PROFILER.stop)
+
+
 async def on_startup(app):
     init_environment()
-    ensure_ssl_certs(CERT_FILE, KEY_FILE)
     
     # Initialize Virtual Keyboard
     global vkab
     vkab = VirtualKeyboard()
     
-    # Start broadcast consumer
-    app['broadcast_task'] = asyncio.create_task(broadcast_loop())
+    # Start broadcast consumer, on its own thread if configured
+    global MOTION_THREAD
+    mt_conf = APP_CONFIG.get("motion_thread", {})
+    if mt_conf.get("enabled"):
+        backend = APP_CONFIG.get("loop", "auto")
+        MOTION_THREAD = MotionThread(cpu=mt_conf.get("cpu"), nice=mt_conf.get("nice"),
+                                     rt_priority=mt_conf.get("rt_priority"),
+                                     loop_factory=lambda: create_event_loop(backend))
+        MOTION_THREAD.start(broadcast_loop, on_start=lambda: PROFILER.register_thread("motion"))
+    else:
+        app['broadcast_task'] = asyncio.create_task(broadcast_loop())
+    
+    # Event-loop watchdog (lag histogram + slow callback stacks)
+    global WATCHDOG
+    wd_conf = APP_CONFIG.get("watchdog", {})
+    WATCHDOG = LoopWatchdog(LOOP_LAG, LOOP_STALLS, LOOP_STALL_DURATION,
+                            threshold=wd_conf.get("threshold_ms", 100) / 1000.0,
+                            interval=wd_conf.get("interval_ms", 50) / 1000.0)
+    app['watchdog_task'] = asyncio.create_task(WATCHDOG.run())
+    
+    # Status feed for the tray
+    try:
+        await STATUS.start()
+        app['status_task'] = asyncio.create_task(status_refresh())
+    except OSError as e:
+        logging.error(f"Status socket unavailable: {e}")
+    
+    # Reload config.json when it is edited by hand
+    app['config_watch_task'] = asyncio.create_task(watch_config_file())
+    
+    # ws:// and Unix-socket endpoints for local tools
+    await start_local_listeners(app)
+    
+    # Socket-activated: hand the port back to systemd when unused (see socket_activation.py)
+    if app['socket_activated'] and APP_CONFIG.get("idle_exit"):
+        app['idle_task'] = asyncio.create_task(exit_when_idle(APP_CONFIG["idle_exit"], last_activity_time))
+    elif APP_CONFIG.get("idle_exit"):
+        logging.info("idle_exit ignored: not started by socket activation")
     
-    # Start input producer thread
+    # Replay a recorded session, if configured
+    if APP_CONFIG.get("replay"):
+        app['replay_task'] = asyncio.create_task(replay_recording(APP_CONFIG["replay"]))
+    
+    # Profiler toggle: kill -USR1 <pid>
     loop = asyncio.get_running_loop()
-    loop.run_in_executor(None, spacenav_thread_func)
+    PROFILER.register_thread("event_loop")
+    loop.add_signal_handler(signal.SIGUSR1, toggle_profiler)
+    
+    # Start input producer threads
+    open_recorder()
+    start_input_threads()
     
     logging.info("Bridge Service Started (aiohttp)")
 
 async def capture_loop_ref(app):
-    global event_queue_loop
-    event_queue_loop = asyncio.get_running_loop()
+    global main_loop
+    main_loop = asyncio.get_running_loop()
+
+
+# Last HTTP request or WebSocket close, for "idle_exit"
+last_activity = time.monotonic()
+
+def last_activity_time():
+    """Now while sessions or telemetry streams are open, else when the last one ended or the last request came."""
+    if connected_controllers or TELEMETRY.subscribers:
+        return time.monotonic()
+    return last_activity
 
 
 @web.middleware
 async def monitor_middleware(request, handler):
+    global last_activity
+    last_activity = time.monotonic()
+    # Discovery probes carry their own headers and are too frequent to log
+    if request.match_info.handler is handle_probe and not is_websocket_upgrade(request):
+        return await handler(request)
+
     # Log valid probes/pings at DEBUG level to avoid spam, errors/others at INFO
-    if request.path == "/" or request.path == "/3dconnexion/nlproxy":
+    if request.path == "/" or request.path == "/3dconnexion/nlproxy" or request.path == "/metrics":
          logging.debug(f"INCOMING: {request.method} {request.path} Origin={request.headers.get('Origin')}")
     else:
          logging.info(f"INCOMING: {request.method} {request.path} Origin={request.headers.get('Origin')}")
@@ -854,42 +1557,184 @@ async def monitor_middleware(request, handler):
     
     return response
 
+# aiohttp's wait for request handlers after on_shutdown; also the slack before _force_exit
+SHUTDOWN_GRACE = 1.0
+
+def _force_exit():
+    logging.error("Shutdown did not finish in time, exiting.")
+    os._exit(1)
+
+async def _finish(task, timeout):
+    """Wait up to `timeout` for task to end by itself, then cancel it."""
+    done, _ = await asyncio.wait({task}, timeout=timeout)
+    if not done:
+        task.cancel()
+        await asyncio.wait({task}, timeout=1.0)
+
 async def on_shutdown(app):
+    """
+    Bounded shutdown, within "shutdown_timeout" seconds:
+    1. stop input: wake and join the reader threads, stop a replay
+    2. drop queued events, let the frame in progress finish its RPCs, then
+       stop the motion pipeline and cancel whatever is still in flight
+    3. flush each session's queued messages and close its WebSocket with
+       1001 (going away), so clients reconnect at once instead of timing out
+    then release held keys and close the recorder, status socket and config
+    writer. If any of it hangs, a timer ends the process after the budget.
+    """
     logging.info("Shutting down app...")
-    if 'broadcast_task' in app:
-         app['broadcast_task'].cancel()
-         try:
-             await app['broadcast_task']
-         except asyncio.CancelledError:
-             pass
-    logging.info("Shutdown complete.")
-    # Force exit to prevent hanging on thread join or aiohttp cleanup
-    os._exit(0)
-
-if __name__ == "__main__":
-    app = web.Application(middlewares=[monitor_middleware])
-    
+    budget = APP_CONFIG.get("shutdown_timeout", 3.0)
+    loop = asyncio.get_running_loop()
+    t0 = time.monotonic()
+    deadline = t0 + budget
+    # Not cancelled: also covers aiohttp's own cleanup and interpreter exit
+    killer = threading.Timer(budget + 2 * SHUTDOWN_GRACE, _force_exit)
+    killer.daemon = True
+    killer.start()
+    def remaining(share=1.0):
+        return max(0.0, deadline - time.monotonic()) * share
+    steps = []
+    def step(name, since):
+        steps.append(f"{name} {(time.monotonic() - since) * 1000:.0f}")
+        return time.monotonic()
+
+    t = time.monotonic()
+    stuck = await loop.run_in_executor(None, stop_input_threads, remaining(0.3))
+    if stuck:
+        logging.warning(f"Reader threads still running: {', '.join(stuck)}")
+    if 'replay_task' in app:
+        app['replay_task'].cancel()
+    t = step("input", t)
+
+    event_queue.clear()
+    event_queue.put_nowait(None)
+    # broadcast_loop returns on the sentinel without awaiting these; cancel
+    # them on their own loop while it still runs (MOTION_THREAD.stop closes it)
+    for ctrl in tuple(connected_controllers.values()):
+        task = ctrl.slow_frame
+        if task is not None and not task.done() and not task.get_loop().is_closed():
+            task.get_loop().call_soon_threadsafe(task.cancel)
+    if MOTION_THREAD:
+        await loop.run_in_executor(None, MOTION_THREAD.stop, remaining(0.5))
+    elif 'broadcast_task' in app:
+        await _finish(app['broadcast_task'], remaining(0.5))
+    cancelled = 0
+    for ctrl in tuple(connected_controllers.values()):
+        for future in ctrl.in_flight_rpcs.values():
+            if not future.done() and not future.get_loop().is_closed():
+                future.get_loop().call_soon_threadsafe(future.cancel)
+                cancelled += 1
+        ctrl.in_flight_rpcs.clear()
+    if cancelled:
+        logging.info(f"Cancelled {cancelled} RPCs in flight.")
+    t = step("rpcs", t)
+
+    sessions = [ctrl.transport.shutdown() for ctrl in tuple(connected_controllers.values()) if ctrl.transport]
+    if sessions:
+        done, pending = await asyncio.wait([asyncio.ensure_future(s) for s in sessions], timeout=max(remaining(), 0.1))
+        if pending:
+            logging.warning(f"{len(pending)} sessions did not close in time.")
+    if 'local_runner' in app:
+        await app['local_runner'].cleanup()
+        if 'local_unix_path' in app:
+            try:
+                os.unlink(app['local_unix_path'])
+            except OSError:
+                pass
+    t = step("sessions", t)
+
+    if vkab:
+        vkab.close()
+    if event_recorder:
+        event_recorder.close()
+    await STATUS.close()
+    # Don't lose a save that is still inside the debounce window
+    await loop.run_in_executor(None, CONFIG_WRITER.close)
+    step("cleanup", t)
+    logging.info(f"Shutdown complete in {(time.monotonic() - t0) * 1000:.0f} ms ({', '.join(steps)} ms).")
+
+def add_routes(app):
     # CORS
     app.router.add_route("OPTIONS", "/{tail:.*}", handle_options)
     
     # Config UI
-    app.router.add_get("/", handle_websocket) # Root handles Probe (JSON) or Redirect
+    app.router.add_get("/", handle_probe) # Root handles Probe (JSON) or Redirect
     app.router.add_get("/config", handle_config)
+    app.router.add_get("/metrics", handle_metrics)
+    app.router.add_get("/trace", handle_trace)
+    app.router.add_get("/trace/summary", handle_trace_summary)
+    app.router.add_get("/debug/stalls", handle_stalls)
+    app.router.add_get("/telemetry", handle_telemetry)
 
     
     # WebSocket
-    app.router.add_get("/3dconnexion/nlproxy", handle_websocket)
+    app.router.add_get("/3dconnexion/nlproxy", handle_probe)
+
+
+async def start_local_listeners(app):
+    """
+    Listeners without TLS for local tools (config key "local_listeners"):
+    "unix" (true for $XDG_RUNTIME_DIR/spacemouse-bridge/wamp.sock, or a path)
+    and "port" (ws:// on 127.0.0.1). Same routes and WAMP API as 8181, and
+    the sessions are ordinary controllers, but scripts, the tray and
+    benchmarks skip the TLS handshake and the certificate. The browser
+    still needs 8181.
+    """
+    conf = APP_CONFIG.get("local_listeners") or {}
+    if not conf.get("unix") and not conf.get("port"):
+        return
+    # Its own Application: the runner of 8181 belongs to run_app. No hooks, so nothing starts twice
+    local = web.Application(middlewares=[monitor_middleware])
+    add_routes(local)
+    runner = web.AppRunner(local, access_log=None, handle_signals=False, shutdown_timeout=SHUTDOWN_GRACE)
+    await runner.setup()
+    app['local_runner'] = runner
+    sites = []
+    if conf.get("unix"):
+        path = conf["unix"] if isinstance(conf["unix"], str) else socket_path("wamp.sock")
+        sites.append((web.UnixSite(runner, path), path))
+    if conf.get("port"):
+        sites.append((web.TCPSite(runner, "127.0.0.1", conf["port"]), None))
+    for site, path in sites:
+        try:
+            if path:
+                if isinstance(conf["unix"], str):
+                    os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)  # the user's choice
+                else:
+                    make_socket_dir(path)
+                remove_stale_socket(path)
+                with private_umask():
+                    await site.start()
+                app['local_unix_path'] = path  # ours now, removed on shutdown
+            else:
+                await site.start()
+            logging.info(f"Local listener: {site.name}")
+        except OSError as e:
+            logging.error(f"Local listener {site.name} unavailable: {e}")
+
+
+if __name__ == "__main__":
+    app = web.Application(middlewares=[monitor_middleware])
+    add_routes(app)
     
     # Hooks
     app.on_startup.append(capture_loop_ref) # CRITICAL: Set global loop var first
     app.on_startup.append(on_startup)
     app.on_shutdown.append(on_shutdown)
     
-    # SSL
+    # SSL (a first run generates the certificate before it is loaded)
+    ensure_ssl_certs(CERT_FILE, KEY_FILE)
     ssl_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
     ssl_context.load_cert_chain(CERT_FILE, KEY_FILE)
     
     # Run
-    # Run
-    # Listen on both IPv4 and IPv6
-    web.run_app(app, host=["0.0.0.0", "::"], port=8181, ssl_context=ssl_context, access_log=None)
+    # Listening sockets from systemd (spacemouse-bridge.socket), else listen on both IPv4 and IPv6
+    sockets = listen_fds()
+    app['socket_activated'] = bool(sockets)
+    if sockets:
+        logging.info(f"Socket-activated: {', '.join(str(s.getsockname()[:2]) for s in sockets)}")
+        listen = {"sock": sockets}
+    else:
+        listen = {"host": ["0.0.0.0", "::"], "port": 8181}
+    web.run_app(app, **listen, ssl_context=ssl_context, access_log=None,
+                shutdown_timeout=SHUTDOWN_GRACE, loop=create_event_loop(APP_CONFIG.get("loop", "auto")))
@@ -0,0 +1,201 @@
+"""
+Minimal Prometheus-style metrics for the bridge.
+
+Everything is preallocated: counters are a single int, histograms a fixed
+list of bucket counts, so updating a metric on the motion path costs an
+attribute add (plus a bisect for histograms). Rendering to the text
+exposition format only happens when /metrics is scraped.
+
+Updates are plain read-modify-writes, so each metric (each child of a
+labelled one) must have a single writing thread. A counter that several
+threads increment, like the ingest counters shared by the device reader
+threads, is created with shared=True: it keeps one cell per thread and
+sums them when read.
+"""
+import bisect
+import threading
+
+# Seconds. Covers sub-millisecond loopback RPCs up to the 0.5s RPC timeout.
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+def bucket_quantile(buckets, counts, q):
+    """
+    Estimate the q-quantile from per-bucket counts (len(buckets) + 1 slots),
+    interpolating linearly inside the bucket. None when there are no samples.
+    """
+    total = sum(counts)
+    if not total:
+        return None
+    rank = q * total
+    cumulative = 0
+    lower = 0.0
+    for i, n in enumerate(counts):
+        if n and cumulative + n >= rank:
+            upper = buckets[i] if i < len(buckets) else buckets[-1]
+            return lower + (upper - lower) * (rank - cumulative) / n
+        cumulative += n
+        if i < len(buckets):
+            lower = buckets[i]
+    return buckets[-1]
+
+
+def _format_labels(labelnames, values, extra=""):
+    pairs = [f'{n}="{v}"' for n, v in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, n=1):
+        self.value += n
+
+    def samples(self, name, labels):
+        yield f"{name}{labels} {self.value}"
+
+
+class SharedCounter:
+    """Counter incremented from several threads: each writes only its own cell, reads sum them."""
+    __slots__ = ("cells",)
+
+    def __init__(self):
+        self.cells = {}  # thread ident -> count
+
+    def inc(self, n=1):
+        cells = self.cells
+        ident = threading.get_ident()
+        cells[ident] = cells.get(ident, 0) + n
+
+    @property
+    def value(self):
+        return sum(list(self.cells.values()))
+
+    def samples(self, name, labels):
+        yield f"{name}{labels} {self.value}"
+
+
+class Gauge:
+    __slots__ = ("value", "fn")
+
+    def __init__(self, fn=None):
+        self.value = 0
+        self.fn = fn
+
+    def set(self, value):
+        self.value = value
+
+    def samples(self, name, labels):
+        value = self.fn() if self.fn else self.value
+        yield f"{name}{labels} {value}"
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        return bucket_quantile(self.buckets, self.counts, q)
+
+    def samples(self, name, labels, labelnames=(), values=()):
+        cumulative = 0
+        for bound, n in zip(self.buckets, self.counts):
+            cumulative += n
+            le = 'le="%s"' % bound
+            yield f"{name}_bucket{_format_labels(labelnames, values, le)} {cumulative}"
+        cumulative += self.counts[-1]
+        le = 'le="+Inf"'
+        yield f"{name}_bucket{_format_labels(labelnames, values, le)} {cumulative}"
+        yield f"{name}_sum{labels} {self.sum}"
+        yield f"{name}_count{labels} {self.count}"
+
+
+class Family:
+    """A named metric, optionally split by labels into children of one kind."""
+
+    def __init__(self, kind, name, help, labelnames=(), factory=None, buckets=None):
+        self.kind = kind
+        self.buckets = buckets
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.factory = factory
+        self.children = {}
+        if not self.labelnames:
+            self.children[()] = factory()
+
+    def labels(self, *values):
+        child = self.children.get(values)
+        if child is None:
+            child = self.children[values] = self.factory()
+        return child
+
+    def total(self):
+        """Sum over all children (counters and set gauges)."""
+        return sum(child.value for child in list(self.children.values()))
+
+    def bucket_counts(self):
+        """Histogram bucket counts summed over all children."""
+        counts = None
+        for child in list(self.children.values()):
+            counts = list(child.counts) if counts is None else [a + b for a, b in zip(counts, child.counts)]
+        return counts or []
+
+    # Unlabelled families proxy straight to their single child
+    def __getattr__(self, attr):
+        # Via __dict__: during copy/unpickling `children` isn't set yet
+        child = self.__dict__.get("children", {}).get(())
+        if child is None:
+            raise AttributeError(f"{type(self).__name__!r} object has no attribute {attr!r}")
+        return getattr(child, attr)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in list(self.children.items()):
+            labels = _format_labels(self.labelnames, values)
+            if self.kind == "histogram":
+                lines.extend(child.samples(self.name, labels, self.labelnames, values))
+            else:
+                lines.extend(child.samples(self.name, labels))
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.families = []
+
+    def _add(self, family):
+        self.families.append(family)
+        return family
+
+    def counter(self, name, help, labelnames=(), shared=False):
+        """shared: incremented from more than one thread (see SharedCounter)."""
+        return self._add(Family("counter", name, help, labelnames, SharedCounter if shared else Counter))
+
+    def gauge(self, name, help, labelnames=(), fn=None):
+        return self._add(Family("gauge", name, help, labelnames, lambda: Gauge(fn)))
+
+    def histogram(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._add(Family("histogram", name, help, labelnames, lambda: Histogram(buckets), buckets))
+
+    def render(self):
+        lines = []
+        for family in self.families:
+            lines.extend(family.render())
+        lines.append("")
+        return "\n".join(lines)
@@ -0,0 +1,134 @@
+"""
+Dedicated thread for the motion pipeline (config key "motion_thread").
+
+By default input events are processed on the aiohttp loop, next to config UI
+page loads, discovery probes and TLS handshakes, and any of those can delay
+a camera update. With the motion thread enabled, events are processed on a
+second event loop running on a thread of its own, optionally pinned to a CPU
+and run at a raised scheduling priority (the spacenavd reader thread gets
+the same treatment). Messages to the client still go out through the
+session's WampTransport on the aiohttp loop, via send_threadsafe().
+
+EventChannel is the handoff from the input thread: a deque the producer
+appends to, waking the consumer's loop only when it is parked in get().
+"""
+import asyncio
+import collections
+import logging
+import os
+import threading
+
+
+class EventChannel:
+    """Unbounded single-consumer queue that any thread (or loop) can put into."""
+
+    def __init__(self):
+        self._items = collections.deque()
+        self._loop = None
+        self._ready = None
+        self._waiting = False
+
+    def qsize(self):
+        return len(self._items)
+
+    def clear(self):
+        self._items.clear()
+
+    def put_nowait(self, item):
+        self._items.append(item)
+        # Appended before _waiting is read: a consumer that saw the deque
+        # empty has already set _waiting, so it can't miss this item
+        if self._waiting:
+            self._waiting = False
+            self._loop.call_soon_threadsafe(self._ready.set)
+
+    async def put(self, item):
+        self.put_nowait(item)
+
+    async def get(self):
+        items = self._items
+        while not items:
+            if self._ready is None:
+                self._loop = asyncio.get_running_loop()
+                self._ready = asyncio.Event()
+            self._ready.clear()
+            self._waiting = True
+            if items:
+                self._waiting = False
+                break
+            await self._ready.wait()
+        return items.popleft()
+
+
+def tune_current_thread(cpu=None, nice=None, rt_priority=None, name=None):
+    """
+    Pin the calling thread to `cpu` and raise its priority: SCHED_FIFO at
+    `rt_priority` if given, else `nice`. Failures (no CAP_SYS_NICE, no such
+    CPU) are logged and the thread keeps its defaults.
+    """
+    name = name or threading.current_thread().name
+    if cpu is not None:
+        try:
+            os.sched_setaffinity(0, {cpu})
+            logging.info(f"{name}: pinned to CPU {cpu}")
+        except (OSError, AttributeError) as e:
+            logging.warning(f"{name}: could not pin to CPU {cpu}: {e}")
+    if rt_priority:
+        try:
+            os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(rt_priority))
+            logging.info(f"{name}: SCHED_FIFO priority {rt_priority}")
+        except (OSError, AttributeError) as e:
+            logging.warning(f"{name}: could not set SCHED_FIFO {rt_priority}: {e}")
+    elif nice is not None:
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), nice)
+            logging.info(f"{name}: nice {nice}")
+        except (OSError, AttributeError) as e:
+            logging.warning(f"{name}: could not set nice {nice}: {e}")
+
+
+class MotionThread:
+    def __init__(self, cpu=None, nice=None, rt_priority=None, loop_factory=asyncio.new_event_loop):
+        self.cpu = cpu
+        self.nice = nice
+        self.rt_priority = rt_priority
+        self.loop_factory = loop_factory
+        self.loop = None
+        self._task = None
+        self._started = threading.Event()
+        self._thread = None
+
+    def start(self, main, on_start=None):
+        """Run the coroutine function `main` on the thread's loop. Returns once the loop is up."""
+        self._thread = threading.Thread(target=self._run, args=(main, on_start), name="motion", daemon=True)
+        self._thread.start()
+        self._started.wait()
+
+    def stop(self, timeout=2.0):
+        """Give main() `timeout` seconds to return by itself, then cancel it."""
+        if self.loop is None or self._thread is None:
+            return
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            try:
+                self.loop.call_soon_threadsafe(self._task.cancel)
+            except RuntimeError:
+                pass  # loop closed meanwhile
+            self._thread.join(1.0)
+
+    def _run(self, main, on_start):
+        tune_current_thread(self.cpu, self.nice, self.rt_priority)
+        if on_start:
+            on_start()
+        self.loop = loop = self.loop_factory()
+        asyncio.set_event_loop(loop)
+        self._task = loop.create_task(main())
+        self._started.set()
+        try:
+            loop.run_until_complete(self._task)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logging.error(f"Motion thread stopped: {e}")
+        finally:
+            loop.close()
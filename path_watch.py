@@ -0,0 +1,99 @@
+"""
+Wait for a path to appear, for reconnecting to spacenavd (or a device node).
+
+PathWatch puts an inotify watch (via ctypes, Linux only) on the directory
+of the path, so a reader thread that lost its connection sleeps until
+spacenavd recreates its socket instead of polling for it. wait() returns
+True as soon as the path is created or replaced, or False after `timeout`
+(the caller's backoff, so a missed event or a daemon that refuses the
+first connection is still retried). Where inotify is unavailable wait()
+just sleeps out the timeout. Either way a `wake_fd` that becomes readable
+ends the wait early (shutdown).
+"""
+import ctypes
+import ctypes.util
+import errno
+import logging
+import os
+import select
+import struct
+
+IN_ATTRIB = 0x00000004
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+# struct inotify_event: wd, mask, cookie, len, then the name
+EVENT_HEADER = struct.Struct("iIII")
+
+_libc = None
+
+
+def _inotify():
+    global _libc
+    if _libc is None:
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+            libc.inotify_init1.argtypes = [ctypes.c_int]
+            libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+            _libc = libc
+        except (OSError, AttributeError):
+            _libc = False
+    return _libc
+
+
+class PathWatch:
+    def __init__(self, path):
+        """Watch for `path` being created; a directory path watches for anything new inside it."""
+        if os.path.isdir(path):
+            self.directory, self.name = path, None
+        else:
+            self.directory, self.name = os.path.split(path)
+        self.fd = None
+        libc = _inotify()
+        if not libc:
+            return
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            logging.debug(f"inotify unavailable: {os.strerror(ctypes.get_errno())}")
+            return
+        mask = IN_CREATE | IN_MOVED_TO | IN_ATTRIB
+        if libc.inotify_add_watch(fd, os.fsencode(self.directory or "."), mask) < 0:
+            err = ctypes.get_errno()
+            os.close(fd)
+            if err != errno.ENOENT:
+                logging.debug(f"Cannot watch {self.directory}: {os.strerror(err)}")
+            return
+        self.fd = fd
+
+    @property
+    def active(self):
+        return self.fd is not None
+
+    def wait(self, timeout, wake_fd=None):
+        """True if the path appeared within `timeout` seconds."""
+        fds = [fd for fd in (self.fd, wake_fd) if fd is not None]
+        ready, _, _ = select.select(fds, [], [], timeout)
+        if wake_fd is not None and wake_fd in ready:
+            return False
+        return self.fd in ready and self._drain()
+
+    def _drain(self):
+        matched = False
+        try:
+            data = os.read(self.fd, 4096)
+        except BlockingIOError:
+            return False
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            _wd, _mask, _cookie, length = EVENT_HEADER.unpack_from(data, offset)
+            name = data[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + length].rstrip(b"\0")
+            if self.name is None or name == os.fsencode(self.name):
+                matched = True
+            offset += EVENT_HEADER.size + length
+        return matched
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
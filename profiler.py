@@ -0,0 +1,117 @@
+"""
+On-demand sampling profiler.
+
+While running, a background thread samples the stacks of the registered
+threads (the asyncio loop and the input thread) at a fixed rate using
+sys._current_frames(). Nothing is hooked into the profiled code, so the
+cost is one stack walk per thread per sample, and nothing at all while
+stopped. On stop, the samples are written in folded-stack format
+("thread;outer;...;inner count") for flamegraph.pl, speedscope or
+inferno.
+"""
+import collections
+import logging
+import math
+import os
+import sys
+import threading
+import time
+
+
+# Sample rates accepted from clients (Hz); the sampler thread must never busy-loop
+MIN_RATE = 1
+MAX_RATE = 1000
+
+
+def _frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)})"
+
+
+class SamplingProfiler:
+    def __init__(self, output_dir, rate=99):
+        self.output_dir = output_dir
+        self.rate = rate
+        self.threads = {}  # ident -> name
+        self.counts = collections.Counter()
+        self.samples = 0
+        self.started = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def register_thread(self, name, ident=None):
+        """Sample this thread (the calling one by default) while profiling."""
+        self.threads[ident or threading.get_ident()] = name
+
+    def start(self, rate=None):
+        """Start sampling, at `rate` Hz clamped to [MIN_RATE, MAX_RATE]. Raises ValueError unless rate is None or a finite number."""
+        if rate is not None and (isinstance(rate, bool) or not isinstance(rate, (int, float)) or not math.isfinite(rate)):
+            raise ValueError("rate must be a finite number")
+        if self.running:
+            return False
+        if rate:
+            self.rate = min(max(rate, MIN_RATE), MAX_RATE)
+        self.counts = collections.Counter()
+        self.samples = 0
+        self.started = time.time()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample_loop, name="profiler", daemon=True)
+        self._thread.start()
+        logging.info(f"Profiler started ({self.rate} Hz, threads: {', '.join(self.threads.values())})")
+        return True
+
+    def stop(self):
+        """Stop sampling and write the folded stacks. Returns the output path, or None if not running."""
+        thread, self._thread = self._thread, None
+        if thread is None:
+            return None
+        self._stop.set()
+        thread.join()
+        counts = self.counts
+
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(self.started))
+        stamp += f".{int(self.started % 1 * 1000):03d}"
+        # Never overwrite an earlier profile, even one started in the same millisecond
+        for n in range(1000):
+            suffix = f"-{n}" if n else ""
+            path = os.path.join(self.output_dir, f"profile-{stamp}{suffix}.folded")
+            try:
+                f = open(path, "x")
+                break
+            except FileExistsError:
+                continue
+        else:
+            raise FileExistsError(path)
+        with f:
+            for stack, count in counts.most_common():
+                f.write(f"{stack} {count}\n")
+        logging.info(f"Profiler stopped: {self.samples} samples written to {path}")
+        return path
+
+    def _sample_loop(self):
+        period = 1.0 / self.rate
+        next_t = time.perf_counter()
+        while not self._stop.is_set():
+            frames = sys._current_frames()
+            for ident, name in list(self.threads.items()):
+                frame = frames.get(ident)
+                if frame is None:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                stack.append(name)
+                self.counts[";".join(reversed(stack))] += 1
+            del frames
+            self.samples += 1
+
+            next_t += period
+            delay = next_t - time.perf_counter()
+            if delay > 0:
+                self._stop.wait(delay)
+            else:
+                next_t = time.perf_counter()
@@ -0,0 +1,283 @@
+"""
+Binary recording and replay of spacenavd input.
+
+A recording is a 16-byte header followed by fixed-size little-endian records,
+one per SpnavEvent, in ingest order:
+
+    int64  t_ns     time.monotonic_ns() when recorded
+    int32  type     SPNAV_EVENT_MOTION / SPNAV_EVENT_BUTTON
+    int32  x, y, z, rx, ry, rz
+    uint32 period
+    int32  press, bnum
+
+Recordings are read through mmap, so slicing, statistics and replay of
+multi-hour files never load them into memory.
+
+    python recorder.py stats session.smrec [--start S] [--end S]
+    python recorder.py slice session.smrec out.smrec --start 60 --end 120
+    python recorder.py dump session.smrec --limit 20
+"""
+import argparse
+import asyncio
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+
+from spnav_wrapper import SpnavEvent, SPNAV_EVENT_MOTION
+
+MAGIC = b"SMRECORD"
+VERSION = 1
+HEADER = struct.Struct("<8sII")
+RECORD = struct.Struct("<qi6iIii")
+AXES = ("x", "y", "z", "rx", "ry", "rz")
+
+# Records processed per struct.iter_unpack call when scanning a file
+CHUNK_RECORDS = 65536
+
+
+def pack_event(event, t_ns):
+    if event.type == SPNAV_EVENT_MOTION:
+        m = event.motion
+        return RECORD.pack(t_ns, event.type, m.x, m.y, m.z, m.rx, m.ry, m.rz, m.period, 0, 0)
+    b = event.button
+    return RECORD.pack(t_ns, event.type, 0, 0, 0, 0, 0, 0, 0, b.press, b.bnum)
+
+
+def unpack_event(record):
+    """Build an SpnavEvent from an unpacked record tuple."""
+    event = SpnavEvent()
+    event.type = record[1]
+    if record[1] == SPNAV_EVENT_MOTION:
+        m = event.motion
+        m.x, m.y, m.z, m.rx, m.ry, m.rz, m.period = record[2:9]
+    else:
+        event.button.press = record[9]
+        event.button.bnum = record[10]
+    return event
+
+
+class EventRecorder:
+    """
+    Appends events to a recording. Shared by the reader threads (one per
+    device): each record is timestamped and written under one lock, so the
+    file stays in time order for Recording.index_at.
+    """
+
+    def __init__(self, path, buffering=1 << 16, flush_interval=1.0):
+        new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self.path = path
+        self.f = open(path, "ab", buffering=buffering)
+        if new:
+            self.f.write(HEADER.pack(MAGIC, VERSION, RECORD.size))
+        else:
+            _check_header(path)
+        self.count = 0
+        self.flush_interval_ns = int(flush_interval * 1e9)
+        self._last_flush = time.monotonic_ns()
+        self._lock = threading.Lock()
+
+    def record(self, event):
+        """Append event stamped with time.monotonic_ns(); flushes at most every flush_interval."""
+        with self._lock:
+            if self.f.closed:
+                return
+            t_ns = time.monotonic_ns()
+            self.f.write(pack_event(event, t_ns))
+            self.count += 1
+            if t_ns - self._last_flush > self.flush_interval_ns:
+                self.f.flush()
+                self._last_flush = t_ns
+
+    def flush(self):
+        with self._lock:
+            self.f.flush()
+
+    def close(self):
+        with self._lock:
+            self.f.close()
+
+
+def _check_header(path):
+    with open(path, "rb") as f:
+        magic, version, size = HEADER.unpack(f.read(HEADER.size))
+    if magic != MAGIC or version != VERSION or size != RECORD.size:
+        raise ValueError(f"{path} is not a version {VERSION} recording")
+
+
+class Recording:
+    """Read-only, memory-mapped view of a recording (or a slice of one)."""
+
+    def __init__(self, path, start=0, stop=None, _mm=None):
+        self.path = path
+        if _mm is None:
+            _check_header(path)
+            with open(path, "rb") as f:
+                _mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.mm = _mm
+        total = (len(_mm) - HEADER.size) // RECORD.size
+        self.start = max(0, start)
+        self.stop = total if stop is None else min(stop, total)
+
+    def __len__(self):
+        return max(0, self.stop - self.start)
+
+    def __getitem__(self, i):
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return RECORD.unpack_from(self.mm, HEADER.size + (self.start + i) * RECORD.size)
+
+    def close(self):
+        self.mm.close()
+
+    def timestamp(self, i):
+        return struct.unpack_from("<q", self.mm, HEADER.size + (self.start + i) * RECORD.size)[0]
+
+    def index_at(self, t_ns):
+        """First index with timestamp >= t_ns (binary search, records are in time order)."""
+        lo, hi = 0, len(self)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.timestamp(mid) < t_ns:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def slice(self, start_s=None, end_s=None):
+        """Sub-recording between start_s and end_s seconds from the first event."""
+        if not len(self):
+            return self
+        t0 = self.timestamp(0)
+        first = self.index_at(t0 + int(start_s * 1e9)) if start_s is not None else 0
+        last = self.index_at(t0 + int(end_s * 1e9)) if end_s is not None else len(self)
+        return Recording(self.path, self.start + first, self.start + last, _mm=self.mm)
+
+    def chunks(self):
+        """Yield iterators of record tuples, CHUNK_RECORDS at a time (bounded memory)."""
+        for first in range(self.start, self.stop, CHUNK_RECORDS):
+            last = min(first + CHUNK_RECORDS, self.stop)
+            yield RECORD.iter_unpack(self.mm[HEADER.size + first * RECORD.size:HEADER.size + last * RECORD.size])
+
+    def __iter__(self):
+        for chunk in self.chunks():
+            yield from chunk
+
+    def write(self, path):
+        """Copy this slice into a new recording file."""
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, RECORD.size))
+            # Through a memoryview, CHUNK_RECORDS at a time: slicing the mmap would copy
+            with memoryview(self.mm) as view:
+                for first in range(self.start, self.stop, CHUNK_RECORDS):
+                    last = min(first + CHUNK_RECORDS, self.stop)
+                    f.write(view[HEADER.size + first * RECORD.size:HEADER.size + last * RECORD.size])
+
+    def stats(self):
+        motion = buttons = presses = 0
+        mins = [None] * 6
+        maxs = [None] * 6
+        abs_sums = [0] * 6
+        max_gap = 0
+        first_t = last_t = None
+        for rec in self:
+            t = rec[0]
+            if last_t is not None and t - last_t > max_gap:
+                max_gap = t - last_t
+            if first_t is None:
+                first_t = t
+            last_t = t
+            if rec[1] == SPNAV_EVENT_MOTION:
+                motion += 1
+                for k in range(6):
+                    v = rec[2 + k]
+                    if mins[k] is None or v < mins[k]:
+                        mins[k] = v
+                    if maxs[k] is None or v > maxs[k]:
+                        maxs[k] = v
+                    abs_sums[k] += v if v >= 0 else -v
+            else:
+                buttons += 1
+                presses += rec[9] != 0
+        duration = (last_t - first_t) / 1e9 if first_t is not None else 0.0
+        return {
+            "events": len(self),
+            "motion": motion,
+            "buttons": buttons,
+            "presses": presses,
+            "duration_s": round(duration, 3),
+            "rate_hz": round(len(self) / duration, 1) if duration else 0.0,
+            "max_gap_ms": round(max_gap / 1e6, 3),
+            "axes": {
+                name: {"min": mins[k], "max": maxs[k],
+                       "mean_abs": round(abs_sums[k] / motion, 2) if motion else 0.0}
+                for k, name in enumerate(AXES)
+            },
+        }
+
+
+async def replay(recording, queue, speed=1.0, telemetry=None):
+    """
+    Feed a recording into an asyncio queue.
+    speed=1.0 is real time, >1 accelerated, 0 as fast as the consumer takes them.
+    Events are stamped with a fresh t_ingest so the latency tracer sees them as live input,
+    and published to `telemetry` (a TelemetryHub) like live input when it has subscribers.
+    """
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    t0 = None
+    sent = 0
+    for chunk in recording.chunks():
+        for rec in chunk:
+            if t0 is None:
+                t0 = rec[0]
+            if speed > 0:
+                delay = start + (rec[0] - t0) / 1e9 / speed - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            elif sent % 256 == 0:
+                await asyncio.sleep(0)
+            event = unpack_event(rec)
+            event.t_ingest = time.monotonic_ns()
+            if telemetry is not None and telemetry.subscribers:
+                telemetry.publish(event)
+            await queue.put(event)
+            sent += 1
+    return sent
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_stats = sub.add_parser("stats", help="Summary statistics")
+    p_stats.add_argument("file")
+    p_slice = sub.add_parser("slice", help="Copy a time window into a new recording")
+    p_slice.add_argument("file")
+    p_slice.add_argument("output")
+    p_dump = sub.add_parser("dump", help="Print records")
+    p_dump.add_argument("file")
+    p_dump.add_argument("--limit", type=int, default=50)
+    for p in (p_stats, p_slice, p_dump):
+        p.add_argument("--start", type=float, help="Seconds from the first event")
+        p.add_argument("--end", type=float, help="Seconds from the first event")
+    args = parser.parse_args()
+
+    rec = Recording(args.file).slice(args.start, args.end)
+    if args.command == "stats":
+        print(json.dumps(rec.stats(), indent=4))
+    elif args.command == "slice":
+        rec.write(args.output)
+        print(f"Wrote {len(rec)} events to {args.output}")
+    elif args.command == "dump":
+        for i, r in enumerate(rec):
+            if i >= args.limit:
+                break
+            kind = "motion" if r[1] == SPNAV_EVENT_MOTION else "button"
+            print(r[0], kind, *r[2:])
+
+
+if __name__ == "__main__":
+    main()
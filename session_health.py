@@ -0,0 +1,121 @@
+"""
+Per-session RPC timeouts and health (config key "rpc_timeout").
+
+    "rpc_timeout": {"min": 0.05, "max": 0.5, "suspend_after": 3, "probe_interval": 1.0}
+
+Every camera frame reads three properties from the client and waits for
+each reply. With one fixed timeout, a session that answers slowly (a
+backgrounded tab, a busy browser) holds every frame for the whole timeout
+per read. Instead each session keeps a smoothed round-trip time and its
+variation, the way TCP does (RFC 6298), and waits srtt + 4 * rttvar,
+clamped to [min, max]. Until the first reply it waits `max`; after a
+timeout the wait doubles (up to `max`) until a reply comes back. Replies
+that arrive after their call timed out still count as RTT samples, so the
+estimate follows a session that got slower.
+
+Consecutive timeouts move a session through three states:
+
+    healthy    every motion event becomes a frame
+    degraded   after `degrade_after` (1): at most one frame per
+               `degraded_interval` (0.1 s)
+    suspended  after `suspend_after` (3): no frames, except one probe
+               frame per `probe_interval` (1 s)
+
+A reply within the timeout makes the session healthy again.
+"""
+import logging
+import time
+
+HEALTHY, DEGRADED, SUSPENDED = "healthy", "degraded", "suspended"
+STATES = (HEALTHY, DEGRADED, SUSPENDED)
+
+DEFAULTS = {
+    "min": 0.05,
+    "max": 0.5,
+    "degrade_after": 1,
+    "suspend_after": 3,
+    "degraded_interval": 0.1,
+    "probe_interval": 1.0,
+}
+
+# RFC 6298 gains
+ALPHA = 1 / 8
+BETA = 1 / 4
+
+
+def rpc_policy(config):
+    """DEFAULTS overridden by the "rpc_timeout" config object."""
+    return dict(DEFAULTS, **config.get("rpc_timeout", {}))
+
+
+def validate_rpc_policy(config):
+    """Raise ValueError for a malformed "rpc_timeout". Called from config_store.validate_config."""
+    options = config.get("rpc_timeout", {})
+    if not isinstance(options, dict):
+        raise ValueError("rpc_timeout must be an object")
+    for key, value in options.items():
+        if key not in DEFAULTS:
+            raise ValueError(f"rpc_timeout has no option {key!r}")
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or value <= 0:
+            raise ValueError(f"rpc_timeout.{key} must be a positive number")
+    policy = rpc_policy(config)
+    if policy["min"] > policy["max"]:
+        raise ValueError("rpc_timeout.min must not exceed rpc_timeout.max")
+
+
+class SessionHealth:
+    def __init__(self, name="session"):
+        self.name = name
+        self.srtt = None
+        self.rttvar = 0.0
+        self.backoff = 1
+        self.timeouts = 0  # consecutive
+        self.state = HEALTHY
+        self._next_frame = 0.0
+
+    def timeout(self, policy):
+        """Seconds to wait for the next reply."""
+        if self.srtt is None:
+            return policy["max"]
+        rto = max(policy["min"], self.srtt + 4 * self.rttvar) * self.backoff
+        return min(rto, policy["max"])
+
+    def observe(self, rtt, in_time=True):
+        """A reply came back after `rtt` seconds; `in_time` if its call was still waiting for it."""
+        if self.srtt is None:
+            self.srtt, self.rttvar = rtt, rtt / 2
+        else:
+            self.rttvar += BETA * (abs(self.srtt - rtt) - self.rttvar)
+            self.srtt += ALPHA * (rtt - self.srtt)
+        if in_time:
+            self.backoff = 1
+            self.timeouts = 0
+            self._set_state(HEALTHY)
+
+    def timed_out(self, policy):
+        self.timeouts += 1
+        self.backoff = min(self.backoff * 2, 64)
+        if self.timeouts >= policy["suspend_after"]:
+            self._set_state(SUSPENDED)
+        elif self.timeouts >= policy["degrade_after"]:
+            self._set_state(DEGRADED)
+
+    def allow_frame(self, policy, now=None):
+        """Whether a motion event should become a frame for this session now."""
+        if self.state == HEALTHY:
+            return True
+        now = time.monotonic() if now is None else now
+        if now < self._next_frame:
+            return False
+        interval = policy["degraded_interval"] if self.state == DEGRADED else policy["probe_interval"]
+        self._next_frame = now + interval
+        return True
+
+    def _set_state(self, state):
+        if state == self.state:
+            return
+        log = logging.info if state == HEALTHY else logging.warning
+        rtt = f"{self.srtt * 1000:.1f} ms" if self.srtt is not None else "n/a"
+        log(f"{self.name}: RPC health {self.state} -> {state} (srtt {rtt}, {self.timeouts} timeouts in a row)")
+        self.state = state
+        self._next_frame = 0.0
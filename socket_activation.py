@@ -0,0 +1,66 @@
+"""
+systemd socket activation for the 8181 listener.
+
+With spacemouse-bridge.socket enabled instead of the service, systemd
+listens on 8181 from login on and starts the bridge on the first
+connection, usually xDesign's discovery probe. That connection waits in the
+socket's backlog while Python starts, instead of being refused. The bridge
+takes the listening sockets over from fd 3 on, as LISTEN_FDS/LISTEN_PID
+announce (sd_listen_fds(3)).
+
+A socket-activated bridge can also exit when nobody has used it for a
+while (config key "idle_exit", seconds), handing the port back to systemd
+until the next connection. Without socket activation "idle_exit" is
+ignored: nothing would start the bridge again.
+
+    systemctl --user enable --now spacemouse-bridge.socket
+    systemd-socket-activate -l 8181 python main.py   # try it by hand
+"""
+import asyncio
+import logging
+import os
+import signal
+import socket
+import time
+
+SD_LISTEN_FDS_START = 3
+
+
+def listen_fds():
+    """Listening sockets passed by systemd, or [] when not socket-activated. Consumes the environment variables."""
+    try:
+        pid = int(os.environ.get("LISTEN_PID", ""))
+        count = int(os.environ.get("LISTEN_FDS", ""))
+    except ValueError:
+        return []
+    finally:
+        # Not for our children (the browser launched by a button, openssl)
+        for name in ("LISTEN_PID", "LISTEN_FDS", "LISTEN_FDNAMES"):
+            os.environ.pop(name, None)
+    if pid != os.getpid():
+        return []
+    sockets = []
+    for fd in range(SD_LISTEN_FDS_START, SD_LISTEN_FDS_START + count):
+        os.set_inheritable(fd, False)
+        sock = socket.socket(fileno=fd)
+        if sock.type != socket.SOCK_STREAM:
+            logging.warning(f"Ignoring inherited fd {fd}: not a stream socket")
+            sock.detach()
+            continue
+        sockets.append(sock)
+    return sockets
+
+
+async def exit_when_idle(timeout, last_activity, interval=None):
+    """
+    SIGTERM ourselves (the usual graceful shutdown) once last_activity(),
+    a time.monotonic() value, is more than `timeout` seconds ago.
+    """
+    interval = interval or min(timeout / 4, 30.0)
+    while True:
+        await asyncio.sleep(interval)
+        idle = time.monotonic() - last_activity()
+        if idle >= timeout:
+            logging.info(f"Idle for {idle:.0f} s, exiting; systemd starts the bridge again on the next connection.")
+            signal.raise_signal(signal.SIGTERM)
+            return
@@ -1,20 +1,33 @@
 import ctypes
+import os
+import socket
+import struct
+import threading
 from ctypes import Structure, Union, c_int, c_uint, c_void_p, c_char_p, c_float
 
-# Load libspnav
+# Load libspnav. Optional when talking to a spacenavd socket directly.
 try:
     libspnav = ctypes.CDLL("libspnav.so")
 except OSError:
     try:
         libspnav = ctypes.CDLL("libspnav.so.0")
     except OSError:
-        raise OSError("Could not find libspnav.so. Please ensure spacenavd and libspnav are installed.")
+        libspnav = None
 
 # Constants
 SPNAV_EVENT_ANY = 0
 SPNAV_EVENT_MOTION = 1
 SPNAV_EVENT_BUTTON = 2
 
+# spacenavd socket protocol (v0): every event is 8 native ints.
+# Motion: [0, x, y, z, rx, ry, rz, period]; button: [1 (press) / 2 (release), bnum, ...]
+SPNAV_SOCKET_PATH = "/var/run/spnav.sock"
+PACKET = struct.Struct("iiiiiiii")
+PACKET_SIZE = PACKET.size
+PROTO_MOTION = 0
+PROTO_PRESS = 1
+PROTO_RELEASE = 2
+
 # Structures
 class SpnavEventMotion(Structure):
     _fields_ = [
@@ -46,43 +59,162 @@ class SpnavEvent(Union):
     ]
 
 # Function Prototypes
-libspnav.spnav_open.argtypes = []
-libspnav.spnav_open.restype = c_int
+if libspnav is not None:
+    libspnav.spnav_open.argtypes = []
+    libspnav.spnav_open.restype = c_int
 
-libspnav.spnav_close.argtypes = []
-libspnav.spnav_close.restype = c_int
+    libspnav.spnav_close.argtypes = []
+    libspnav.spnav_close.restype = c_int
 
-libspnav.spnav_fd.argtypes = []
-libspnav.spnav_fd.restype = c_int
+    libspnav.spnav_fd.argtypes = []
+    libspnav.spnav_fd.restype = c_int
 
-libspnav.spnav_poll_event.argtypes = [ctypes.POINTER(SpnavEvent)]
-libspnav.spnav_poll_event.restype = c_int
+    libspnav.spnav_poll_event.argtypes = [ctypes.POINTER(SpnavEvent)]
+    libspnav.spnav_poll_event.restype = c_int
 
-libspnav.spnav_wait_event.argtypes = [ctypes.POINTER(SpnavEvent)]
-libspnav.spnav_wait_event.restype = c_int
+    libspnav.spnav_wait_event.argtypes = [ctypes.POINTER(SpnavEvent)]
+    libspnav.spnav_wait_event.restype = c_int
 
 # Pythonic API
 class SpnavError(Exception):
     pass
 
-def spnav_open():
-    if libspnav.spnav_open() == -1:
-        raise SpnavError("Failed to connect to spacenavd daemon")
+def decode_packet(data):
+    """Decode one 32-byte spacenavd packet into an SpnavEvent (same layout libspnav fills in)."""
+    vals = PACKET.unpack(data)
+    event = SpnavEvent()
+    if vals[0] == PROTO_MOTION:
+        event.type = SPNAV_EVENT_MOTION
+        m = event.motion
+        m.x, m.y, m.z, m.rx, m.ry, m.rz, m.period = vals[1:8]
+    else:
+        event.type = SPNAV_EVENT_BUTTON
+        event.button.press = 1 if vals[0] == PROTO_PRESS else 0
+        event.button.bnum = vals[1]
+    return event
+
+def _recv_packet(sock):
+    data = sock.recv(PACKET_SIZE, socket.MSG_WAITALL)
+    if len(data) < PACKET_SIZE:
+        raise SpnavError("spacenavd closed the connection")
+    return data
+
+class SpnavConnection:
+    """
+    One connection to spacenavd. With a socket path the spacenavd socket
+    protocol is spoken directly, and several connections (e.g. one per
+    spacenavd instance or tools/fake_spacenavd.py) can be open at once.
+    Without one it goes through libspnav, which allows a single connection
+    per process.
+    """
+    def __init__(self, socket_path=None):
+        self.socket_path = socket_path
+        self._sock = None
+        self._close_lock = threading.Lock()  # close() vs shutdown() from another thread
+
+    def open(self):
+        if self.socket_path:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                sock.connect(self.socket_path)
+            except OSError as e:
+                sock.close()
+                raise SpnavError(f"Failed to connect to spacenavd at {self.socket_path}: {e}")
+            self._sock = sock
+            return
+
+        if libspnav is None:
+            raise OSError("Could not find libspnav.so. Please ensure spacenavd and libspnav are installed.")
+        if libspnav.spnav_open() == -1:
+            raise SpnavError("Failed to connect to spacenavd daemon")
+
+    def close(self):
+        with self._close_lock:
+            if self._sock is not None:
+                self._sock.close()
+                self._sock = None
+            elif libspnav is not None:
+                libspnav.spnav_close()
+
+    def poll_event(self):
+        if self._sock is not None:
+            self._sock.setblocking(False)
+            try:
+                data = self._sock.recv(PACKET_SIZE, socket.MSG_PEEK)
+            except BlockingIOError:
+                return None
+            finally:
+                self._sock.setblocking(True)
+            if len(data) < PACKET_SIZE:
+                if not data:
+                    raise SpnavError("spacenavd closed the connection")
+                return None
+            return decode_packet(_recv_packet(self._sock))
+
+        event = SpnavEvent()
+        if libspnav.spnav_poll_event(ctypes.byref(event)):
+            return event
+        return None
+
+    def wait_event(self):
+        if self._sock is not None:
+            return decode_packet(_recv_packet(self._sock))
+
+        event = SpnavEvent()
+        if libspnav.spnav_wait_event(ctypes.byref(event)):
+            return event
+        return None
+
+    def fileno(self):
+        if self._sock is not None:
+            return self._sock.fileno()
+        return libspnav.spnav_fd()
+
+    def shutdown(self):
+        """
+        Wake a wait_event() blocked in another thread: the socket is shut
+        down, so it returns as if spacenavd had closed the connection.
+        libspnav's socket is shut down through a duplicate of its fd.
+        """
+        with self._close_lock:
+            sock = self._sock
+            if sock is None:
+                # Without the lock libspnav could close this fd, and the number be reused, before the dup
+                fd = libspnav.spnav_fd() if libspnav is not None else -1
+                if fd < 0:
+                    return
+                sock = socket.socket(fileno=os.dup(fd))
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            finally:
+                if sock is not self._sock:
+                    sock.close()
+
+    def watch_path(self):
+        """Path whose creation means spacenavd is back (for path_watch.PathWatch)."""
+        return self.socket_path or SPNAV_SOCKET_PATH
+
+# Module-level API on a default connection, as used before SpnavConnection existed
+_default = SpnavConnection()
+
+def spnav_open(socket_path=None):
+    """
+    Connect to spacenavd. By default this goes through libspnav; with socket_path
+    the spacenavd socket protocol is spoken directly (e.g. for tools/fake_spacenavd.py).
+    """
+    _default.socket_path = socket_path
+    _default.open()
 
 def spnav_close():
-    libspnav.spnav_close()
+    _default.close()
 
 def spnav_poll_event():
-    event = SpnavEvent()
-    if libspnav.spnav_poll_event(ctypes.byref(event)):
-        return event
-    return None
+    return _default.poll_event()
 
 def spnav_wait_event():
-    event = SpnavEvent()
-    if libspnav.spnav_wait_event(ctypes.byref(event)):
-        return event
-    return None
+    return _default.wait_event()
 
 def spnav_fd():
-    return libspnav.spnav_fd()
+    return _default.fileno()
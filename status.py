@@ -0,0 +1,211 @@
+"""
+Bridge status feed for the tray (and scripts).
+
+The bridge listens on a Unix socket, by default
+$XDG_RUNTIME_DIR/spacemouse-bridge/status.sock. Each client gets the full
+state as one JSON line on connect, then again whenever it changes
+(newline-delimited JSON, at most one line per `min_interval`):
+
+    {"pid": 1234, "spacenavd": true, "devices": {"default": true}, "clients": 1, "focus": true, "motion": false,
+     "unhealthy": 0, "errors": {"rpc_timeouts": 0, "motion_errors": 0, "loop_stalls": 0},
+     "perf": {"event_rate": 0.0, "rtt_ms": null, "dropped": 0, "key_ms": null}}
+
+"spacenavd" is true while any input device is connected; "devices" has
+each one (see devices.py). "motion" and "perf" are sampled once a second
+and describe that second: input events/s, median RPC round trip, motion
+events that produced no frame, and median key-injection time (null
+without samples). "unhealthy", sampled with them, counts the sessions
+whose RPCs are timing out (see session_health.py).
+
+Clients never send anything. No TLS, no WAMP session, and the bridge does
+not treat them as xDesign controllers.
+
+    socat - UNIX-CONNECT:$XDG_RUNTIME_DIR/spacemouse-bridge/status.sock
+"""
+import asyncio
+import contextlib
+import errno
+import json
+import logging
+import os
+import socket
+import stat
+import tempfile
+
+# A reader this far behind is stuck; drop it rather than buffer forever
+MAX_BUFFERED = 64 * 1024
+
+
+def _fallback_runtime_dir():
+    # Predictable name in a shared directory: only used after check_private_dir
+    return os.path.join(tempfile.gettempdir(), f"spacemouse-bridge-{os.getuid()}")
+
+
+def socket_path(name="status.sock"):
+    """$XDG_RUNTIME_DIR/spacemouse-bridge/<name>, also used for the local WAMP socket (wamp.sock)."""
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if not runtime_dir:
+        runtime_dir = f"/run/user/{os.getuid()}"
+        if not os.path.isdir(runtime_dir):
+            runtime_dir = _fallback_runtime_dir()
+    return os.path.join(runtime_dir, "spacemouse-bridge", name)
+
+
+def check_private_dir(path, create=False):
+    """
+    Raise PermissionError unless path is a real directory (not a symlink)
+    owned by us with no group or other permissions. With create, make it
+    0700 first if it doesn't exist. Another local user could otherwise
+    create the directory first and swap our socket for theirs.
+    """
+    if create:
+        try:
+            os.mkdir(path, 0o700)
+        except FileExistsError:
+            pass
+    st = os.lstat(path)
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid() or st.st_mode & 0o077:
+        raise PermissionError(errno.EPERM, "not a private directory owned by this user", path)
+
+
+def make_socket_dir(path):
+    """Create the private directories for a socket_path() path, checking any that already exist."""
+    directory = os.path.dirname(path)
+    parent = os.path.dirname(directory)
+    if parent == _fallback_runtime_dir():
+        check_private_dir(parent, create=True)
+    else:
+        os.makedirs(parent, exist_ok=True)
+    check_private_dir(directory, create=True)
+
+
+def remove_stale_socket(path):
+    """
+    Unlink a socket left behind by a previous run. Raises OSError instead if
+    path is not a socket or something still accepts connections on it
+    (another bridge), so neither gets deleted.
+    """
+    try:
+        mode = os.lstat(path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise FileExistsError(errno.EEXIST, "exists and is not a socket", path)
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except ConnectionRefusedError:
+        os.unlink(path)
+        return
+    finally:
+        probe.close()
+    raise OSError(errno.EADDRINUSE, "already in use by another process", path)
+
+
+@contextlib.contextmanager
+def private_umask():
+    """Sockets bound inside are created 0600 (0700 for directories) instead of chmod()ed afterwards."""
+    old = os.umask(0o077)
+    try:
+        yield
+    finally:
+        os.umask(old)
+
+
+class StatusServer:
+    def __init__(self, path=None, min_interval=0.2):
+        self.path = path or socket_path()
+        self.min_interval = min_interval
+        self.state = {"pid": os.getpid(), "spacenavd": False, "devices": {}, "clients": 0, "focus": False, "motion": False,
+                      "unhealthy": 0, "errors": {}, "perf": {}}
+        self.writers = set()
+        self._server = None
+        self._loop = None
+        self._flush_handle = None
+        self._last_flush = 0.0
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        make_socket_dir(self.path)
+        remove_stale_socket(self.path)
+        with private_umask():
+            self._server = await asyncio.start_unix_server(self._on_client, path=self.path)
+        logging.info(f"Status feed on {self.path}")
+
+    async def close(self):
+        if self._server:
+            self._server.close()
+            self._server = None
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+        for writer in list(self.writers):
+            writer.close()
+        self.writers.clear()
+
+    def update(self, **fields):
+        """Merge fields into the state; push to clients if anything changed. Loop thread only."""
+        changed = False
+        for key, value in fields.items():
+            if self.state.get(key) != value:
+                self.state[key] = value
+                changed = True
+        if changed and self.writers and self._flush_handle is None:
+            delay = max(0.0, self._last_flush + self.min_interval - self._loop.time())
+            self._flush_handle = self._loop.call_later(delay, self._flush)
+
+    def update_threadsafe(self, **fields):
+        if self._loop:
+            self._loop.call_soon_threadsafe(lambda: self.update(**fields))
+        else:
+            self.state.update(fields)
+
+    def _line(self):
+        return json.dumps(self.state, separators=(",", ":")).encode() + b"\n"
+
+    def _flush(self):
+        self._flush_handle = None
+        self._last_flush = self._loop.time()
+        line = self._line()
+        for writer in list(self.writers):
+            if writer.transport.get_write_buffer_size() > MAX_BUFFERED:
+                logging.warning("Dropping stalled status client")
+                self.writers.discard(writer)
+                writer.close()
+            else:
+                writer.write(line)
+
+    async def _on_client(self, reader, writer):
+        self.writers.add(writer)
+        writer.write(self._line())
+        try:
+            await reader.read()  # until EOF
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            self.writers.discard(writer)
+            writer.close()
+
+
+def read_status(path=None, timeout=None):
+    """
+    Blocking client: yields state dicts from the bridge until the connection
+    drops. Raises OSError if the bridge isn't listening.
+    """
+    path = path or socket_path()
+    for directory in (os.path.dirname(os.path.dirname(path)), os.path.dirname(path)):
+        if directory.startswith(_fallback_runtime_dir()):
+            check_private_dir(directory)  # don't talk to a socket someone else planted
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(path)
+        with sock.makefile("rb") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+    finally:
+        sock.close()
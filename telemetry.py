@@ -0,0 +1,112 @@
+"""
+Live axis telemetry for the config UI (GET /telemetry, server-sent events).
+
+The input threads publish every event into a TelemetryHub, which keeps only
+the latest motion sample and the button state. Each subscriber samples that
+at its own rate and sends frames in batches:
+
+    data: [{"t": 1234.5, "raw": [x, y, z, rx, ry, rz], "shaped": [...],
+            "buttons": [0], "edges": [[0, 1]]}, ...]
+
+"shaped" is the post-curve value (deadzone + gamma) the motion path uses.
+"edges" lists button presses (1) and releases (0) since the previous frame,
+so short clicks are not lost to downsampling. With no subscribers, publish
+is never called (callers check `hub.subscribers` first).
+"""
+import asyncio
+import collections
+import json
+import threading
+import time
+
+from spnav_wrapper import SPNAV_EVENT_MOTION
+
+MAX_RATE = 250.0
+MAX_BATCH = 50
+KEEPALIVE = 15.0
+
+
+class Subscriber:
+    def __init__(self, rate, batch):
+        self.rate = min(max(rate, 1.0), MAX_RATE)
+        self.batch = min(max(batch, 1), MAX_BATCH)
+        self.edges = collections.deque(maxlen=256)
+        self.last_seq = 0
+
+
+class TelemetryHub:
+    def __init__(self, shape):
+        self.shape = shape  # callable returning the post-curve value of a raw axis
+        self.subscribers = ()  # replaced, never mutated: the input thread iterates it
+        self.seq = 0
+        self.latest = None
+        self.pressed = frozenset()
+        # publish() runs on every device's reader thread; button state is read-modify-write
+        self._lock = threading.Lock()
+
+    def subscribe(self, rate=30.0, batch=1):
+        sub = Subscriber(rate, batch)
+        self.subscribers = self.subscribers + (sub,)
+        return sub
+
+    def unsubscribe(self, sub):
+        self.subscribers = tuple(s for s in self.subscribers if s is not sub)
+
+    def publish(self, event):
+        """Called from the input threads for every event while someone is subscribed."""
+        if event.type == SPNAV_EVENT_MOTION:
+            m = event.motion
+            raw = (m.x, m.y, m.z, m.rx, m.ry, m.rz)
+            shape = self.shape
+            latest = (time.monotonic(), raw, tuple(shape(v) for v in raw))
+            with self._lock:
+                self.latest = latest
+                self.seq += 1
+        else:
+            bnum, press = event.button.bnum, int(event.button.press != 0)
+            with self._lock:
+                self.pressed = self.pressed | {bnum} if press else self.pressed - {bnum}
+            for sub in self.subscribers:
+                sub.edges.append((bnum, press))
+
+    def _frame(self, sub):
+        if sub.last_seq == self.seq and not sub.edges:
+            return None
+        sub.last_seq = self.seq
+        t, raw, shaped = self.latest or (time.monotonic(), (0,) * 6, (0,) * 6)
+        edges = []
+        while sub.edges:
+            edges.append(sub.edges.popleft())
+        return {
+            "t": round(t * 1000.0, 1),
+            "raw": raw,
+            "shaped": [round(v, 2) for v in shaped],
+            "buttons": sorted(self.pressed),
+            "edges": edges,
+        }
+
+    async def stream(self, sub):
+        """Yield SSE-encoded chunks for one subscriber until cancelled."""
+        loop = asyncio.get_running_loop()
+        period = 1.0 / sub.rate
+        next_t = loop.time()
+        last_sent = next_t
+        frames = []
+        while True:
+            next_t += period
+            delay = next_t - loop.time()
+            if delay <= 0:
+                next_t = loop.time()  # fell behind, don't try to catch up
+            # Always yield, even when behind: this loop must never hold the event loop
+            await asyncio.sleep(max(delay, 0))
+            frame = self._frame(sub)
+            if frame:
+                frames.append(frame)
+            if len(frames) >= sub.batch or (frames and not frame):
+                # A partial batch goes out as soon as input pauses
+                yield b"data: " + json.dumps(frames, separators=(",", ":")).encode() + b"\n\n"
+                frames = []
+                last_sent = next_t
+            elif next_t - last_sent > KEEPALIVE:
+                yield b": keepalive\n\n"
+                last_sent = next_t
@@ -0,0 +1,437 @@
+"""
+Benchmark harness for the bridge.
+
+Microbenchmarks time the hot-path stages in-process:
+    spnav_decode      spacenavd packet -> SpnavEvent
+    evdev_decode      input_event sample (6 axes + SYN) -> SpnavEvent, direct backend
+    shape_axes        deadzone + gamma curve lookup on six axes
+    process_motion    full matrix path with the client RPCs stubbed out
+    rpc_encode        json.dumps of an outbound view.affine update
+    press_combo_parse combo string -> evdev key codes
+    device_merge_*    DeviceMixer.update with four devices, per merge policy
+
+End-to-end scenarios start tools/fake_spacenavd.py and the bridge
+(main.py, port 8181 must be free), connect tools/mock_xdesign.py sessions
+and collect frame rate, latency-tracer percentiles and RPC timeouts.
+
+    python tools/bench.py run --output bench-results/baseline.json
+    python tools/bench.py run --micro-only --output current.json
+    python tools/bench.py compare bench-results/baseline.json current.json --threshold 0.10
+
+compare exits non-zero when any result regressed by more than the threshold.
+tools/hid_bench.py compares the spacenavd and direct evdev input paths.
+
+A/B runs of a bridge setting use --config, e.g. batched vs per-message
+WebSocket writes:
+
+    python tools/bench.py run --scenario steady_1khz --config '{"ws_transport": {"coalesce": false}}' --output a.json
+    python tools/bench.py run --scenario steady_1khz --output b.json
+    python tools/bench.py compare a.json b.json
+
+The same works for the event loop ({"loop": "asyncio"} vs {"loop": "uvloop"});
+wakeup_50hz and saturate are the scenarios where it shows.
+
+--endpoint connects the mock sessions through the bridge's local listeners
+instead of wss://:8181: "ws" (plain WebSocket on 127.0.0.1:8182) or "unix"
+(Unix socket), to take TLS out of the measurement.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+import ssl
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TOOLS = os.path.join(ROOT, "tools")
+sys.path.insert(0, ROOT)
+sys.path.insert(0, TOOLS)
+
+BRIDGE_URL = "https://localhost:8181"
+
+# Direction of "better" for scenario metrics (micro results are always lower-is-better)
+HIGHER_IS_BETTER = ("frames_per_sec", "events_per_sec", "probes_per_sec", "http_probes_per_sec", "healthy_frames_per_sec")
+
+
+def timeit(fn, number, repeat=5):
+    """Best-of-repeat nanoseconds per call."""
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter_ns()
+        for _ in range(number):
+            fn()
+        per_op = (time.perf_counter_ns() - t0) / number
+        best = per_op if best is None else min(best, per_op)
+    return best
+
+
+def import_bridge(config_home):
+    """Import main.py as a module without touching the user's config."""
+    os.environ["XDG_CONFIG_HOME"] = config_home
+    import main
+    # Keep the bridge's DEBUG records from flooding the terminal; they are still created.
+    logging.getLogger().handlers = [logging.NullHandler()]
+    main.apply_config(dict(main.DEFAULT_CONFIG, sensitivity=0.5, gamma=1.5, deadzone=10))
+    return main
+
+
+# ---------------------------------------------------------
+# Microbenchmarks
+# ---------------------------------------------------------
+
+def micro_benchmarks(main, scale=1.0):
+    import hid_backend
+    import spnav_wrapper
+    import uinput_wrapper
+    from devices import DeviceMixer, MERGE_POLICIES
+
+    results = {}
+
+    def record(name, fn, number):
+        number = max(1, int(number * scale))
+        results[name] = {"ns_per_op": round(timeit(fn, number), 1), "number": number}
+
+    packet = spnav_wrapper.PACKET.pack(0, 120, -45, 300, 12, -8, 250, 8)
+    record("spnav_decode", lambda: spnav_wrapper.decode_packet(packet), 100000)
+
+    # Same sample as the direct evdev backend reads it: six axes and a SYN_REPORT
+    decoder = hid_backend.EvdevDecoder()
+    sample = b"".join(hid_backend.INPUT_EVENT.pack(0, 0, hid_backend.EV_ABS, axis, v)
+                      for axis, v in enumerate((120, -45, 300, 12, -8, 250)))
+    sample += hid_backend.INPUT_EVENT.pack(0, 0, hid_backend.EV_SYN, hid_backend.SYN_REPORT, 0)
+    record("evdev_decode", lambda: decoder.feed(sample), 50000)
+
+    values = (0, 5, -9, 10, 42, -120, 349, -350, 400)
+    shape = main.RUNTIME.shape
+
+    def shape_axes():
+        for v in values[:6]:
+            shape(v)
+    record("shape_axes", shape_axes, 50000)
+
+    results["process_motion"] = bench_process_motion(main, scale)
+
+    topic = "3dconnexion:3dcontroller/controller0"
+    affine = [1.0, 0.0, 0.0, 0.0, 0.0, 0.9998, -0.0175, 0.0, 0.0, 0.0175, 0.9998, 0.0, 12.5, -3.25, 480.0, 1.0]
+    msg = [main.WAMP_EVENT, topic, [main.WAMP_CALL, "ABCDEFGHIJKLMNOP", "self:update", "", "view.affine", affine]]
+    record("rpc_encode", lambda: json.dumps(msg), 50000)
+
+    record("press_combo_parse", lambda: uinput_wrapper.parse_combo("ctrl+shift+5"), 50000)
+
+    # Four devices, the event's own one deflected and another active
+    names = ["dev0", "dev1", "dev2", "dev3"]
+    active = (0.01, -0.02, 0.0, 0.1, 0.0, -0.3)
+    for policy in MERGE_POLICIES:
+        mixer = DeviceMixer(names, policy, {"dev1": 1})
+        mixer.update("dev1", active)
+        record(f"device_merge_{policy}", lambda: mixer.update("dev0", active), 100000)
+    return results
+
+
+class _StubController:
+    """Controller whose RPCs answer immediately from a fixed scene."""
+
+    SCENE = {
+        "view.perspective": True,
+        "view.affine": [1.0, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 500.0, 1.0],
+        "model.extents": [-50.0, -50.0, -50.0, 50.0, 50.0, 50.0],
+    }
+
+    @classmethod
+    def build(cls, main):
+        class Stub(main.Controller):
+            async def remote_read(self, property_name):
+                return cls.SCENE.get(property_name)
+
+            async def remote_write(self, property_name, value):
+                return None
+
+        ctrl = Stub(None, {})
+        ctrl.subscribed_topic = "3dconnexion:3dcontroller/controller0"
+        ctrl.focus = True
+        return ctrl
+
+
+def bench_process_motion(main, scale):
+    import spnav_wrapper
+    ctrl = _StubController.build(main)
+    event = spnav_wrapper.decode_packet(spnav_wrapper.PACKET.pack(0, 120, -45, 300, 12, -8, 250, 8))
+    number = max(1, int(2000 * scale))
+
+    async def run():
+        best = None
+        for _ in range(5):
+            t0 = time.perf_counter_ns()
+            for _ in range(number):
+                await ctrl.process_motion(event)
+            per_op = (time.perf_counter_ns() - t0) / number
+            best = per_op if best is None else min(best, per_op)
+        return best
+
+    return {"ns_per_op": round(asyncio.run(run()), 1), "number": number}
+
+
+# ---------------------------------------------------------
+# End-to-end scenarios
+# ---------------------------------------------------------
+
+SCENARIOS = {
+    # name: fake spacenavd settings, mock client settings
+    "steady_1khz": {"spacenavd": ["--rate", "1000", "--pattern", "sine"],
+                    "mock": {"sessions": 1, "delay": 0.001, "jitter": 0.0, "fps": 0}},
+    "bursts_4_tabs": {"spacenavd": ["--rate", "500", "--pattern", "burst"],
+                      "mock": {"sessions": 4, "delay": 0.002, "jitter": 0.001, "fps": 60}},
+    "deadzone_noise": {"spacenavd": ["--rate", "250", "--pattern", "noise"],
+                       "mock": {"sessions": 1, "delay": 0.001, "jitter": 0.0, "fps": 0}},
+    # Input slow enough that the queue stays empty: "queue" is the thread -> loop wakeup
+    "wakeup_50hz": {"spacenavd": ["--rate", "50", "--pattern", "sine"],
+                    "mock": {"sessions": 1, "delay": 0.0, "jitter": 0.0, "fps": 0}},
+    # Instant replies: frames/s is bounded by the bridge and the TLS WebSocket itself
+    "saturate": {"spacenavd": ["--rate", "2000", "--pattern", "sine"],
+                 "mock": {"sessions": 1, "delay": 0.0, "jitter": 0.0, "fps": 0}},
+    # N devices (one fake spacenavd each) at 250 Hz, merged with "sum": ingest and merge cost per device
+    "devices_1": {"spacenavd": ["--rate", "250", "--pattern", "sine"], "devices": 1,
+                  "mock": {"sessions": 1, "delay": 0.001, "jitter": 0.0, "fps": 0}},
+    "devices_2": {"spacenavd": ["--rate", "250", "--pattern", "sine"], "devices": 2,
+                  "mock": {"sessions": 1, "delay": 0.001, "jitter": 0.0, "fps": 0}},
+    "devices_4": {"spacenavd": ["--rate", "250", "--pattern", "sine"], "devices": 4,
+                  "mock": {"sessions": 1, "delay": 0.001, "jitter": 0.0, "fps": 0}},
+    # Motion while tools/probe_load.py opens a TLS connection per request: frame interval
+    # and latency tails show how much HTTP serving disturbs the camera
+    "http_load": {"spacenavd": ["--rate", "20", "--pattern", "sine"],
+                  "mock": {"sessions": 1, "delay": 0.001, "jitter": 0.0, "fps": 0},
+                  "probe_load": ["--concurrency", "8", "--new-connections"]},
+    # One tab answering after 2 s next to a normal one: healthy_frames_per_sec is what the
+    # normal tab still gets (see session_health.py)
+    "stalled_tab": {"spacenavd": ["--rate", "250", "--pattern", "sine"],
+                    "mock": {"sessions": 2, "delay": 0.001, "jitter": 0.0, "fps": 0, "slow": 1, "slow_delay": 2.0}},
+}
+
+
+def _fetch(path):
+    ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    ctx.check_hostname = False
+    ctx.verify_mode = ssl.CERT_NONE
+    with urllib.request.urlopen(BRIDGE_URL + path, context=ctx, timeout=5) as resp:
+        return resp.read().decode("utf-8")
+
+
+def _metric_total(text, name):
+    total = 0.0
+    for line in text.splitlines():
+        if line.startswith(name):
+            m = re.match(rf"{re.escape(name)}(\{{.*\}})? (\S+)$", line)
+            if m:
+                total += float(m.group(2))
+    return total
+
+
+def _wait_for_bridge(timeout=15.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            _fetch("/3dconnexion/nlproxy")
+            return
+        except Exception:
+            time.sleep(0.2)
+    raise RuntimeError("Bridge did not come up on :8181")
+
+
+LOCAL_PORT = 8182
+
+
+def run_scenario(main, name, spec, config_home, duration, extra_config=None, endpoint="wss"):
+    from mock_xdesign import run_sessions
+
+    socket_path = os.path.join(config_home, f"spnav-{name}.sock")
+    config = dict(main.APP_CONFIG, spacenav_socket=socket_path)
+    sockets = [socket_path]
+    if "devices" in spec:
+        sockets = [os.path.join(config_home, f"spnav-{name}-{i}.sock") for i in range(spec["devices"])]
+        config["devices"] = [{"name": f"dev{i}", "socket": path} for i, path in enumerate(sockets)]
+    url, unix = "wss://localhost:8181/3dconnexion/nlproxy", None
+    if endpoint == "ws":
+        config["local_listeners"] = {"port": LOCAL_PORT}
+        url = f"ws://127.0.0.1:{LOCAL_PORT}/3dconnexion/nlproxy"
+    elif endpoint == "unix":
+        unix = os.path.join(config_home, "wamp.sock")
+        config["local_listeners"] = {"unix": unix}
+    config.update(extra_config or {})
+    with open(os.path.join(config_home, "spacemouse-bridge", "config.json"), "w") as f:
+        json.dump(config, f)
+
+    env = dict(os.environ, XDG_CONFIG_HOME=config_home)
+    devnull = subprocess.DEVNULL
+    # Different seeds so several fake devices don't move in lockstep
+    spacenavds = [subprocess.Popen([sys.executable, os.path.join(TOOLS, "fake_spacenavd.py"),
+                                    "--socket", path, "--seed", str(i), *spec["spacenavd"]],
+                                   stdout=devnull, stderr=devnull)
+                  for i, path in enumerate(sockets)]
+    bridge = subprocess.Popen([sys.executable, os.path.join(ROOT, "main.py")],
+                              cwd=ROOT, env=env, stdout=devnull, stderr=devnull)
+    load = None
+    try:
+        _wait_for_bridge()
+        if "probe_load" in spec:
+            load = subprocess.Popen([sys.executable, os.path.join(TOOLS, "probe_load.py"),
+                                     "--duration", str(duration), *spec["probe_load"]],
+                                    stdout=subprocess.PIPE, stderr=devnull)
+        ingested = _metric_total(_fetch("/metrics"), "spacemouse_events_ingested_total")
+        t0 = time.monotonic()
+        mock = spec["mock"]
+        stats = asyncio.run(run_sessions(url, mock["sessions"], duration,
+                                         mock["delay"], mock["jitter"], mock["fps"],
+                                         mock.get("slow", 0), mock.get("slow_delay", 0.0), unix))
+        if load:
+            load_stats = json.loads(load.communicate(timeout=duration + 30)[0])
+        summary = json.loads(_fetch("/trace/summary"))
+        metrics = _fetch("/metrics")
+        ingested = (_metric_total(metrics, "spacemouse_events_ingested_total") - ingested) / (time.monotonic() - t0)
+    finally:
+        if load and load.poll() is None:
+            load.kill()
+        for proc in (bridge, *spacenavds):
+            proc.terminate()
+        for proc in (bridge, *spacenavds):
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+    result = {
+        "frames_per_sec": stats["frames_per_sec"],
+        "errors": len(stats["errors"]),
+        "latency_total_p50_ms": round(summary["total"]["p50"], 3),
+        "latency_total_p95_ms": round(summary["total"]["p95"], 3),
+        "latency_total_p99_ms": round(summary["total"]["p99"], 3),
+        "latency_queue_p50_ms": round(summary["queue"]["p50"], 3),
+        "latency_queue_p95_ms": round(summary["queue"]["p95"], 3),
+        "latency_rpc_p50_ms": round(summary["read.affine"]["p50"], 3),
+        "latency_rpc_p95_ms": round(summary["read.affine"]["p95"], 3),
+        "rpc_timeouts": _metric_total(metrics, "spacemouse_rpc_timeouts_total"),
+        "events_per_sec": round(ingested, 1),
+        "frame_interval_p99_ms": max((s["frame_interval_ms"]["p99"] for s in stats["per_session"]), default=0.0),
+    }
+    if mock.get("slow"):
+        healthy = stats["per_session"][:mock["sessions"] - mock["slow"]]
+        result["healthy_frames_per_sec"] = round(sum(s["frames"] for s in healthy) / duration, 1)
+        result["healthy_frame_interval_p99_ms"] = max(s["frame_interval_ms"]["p99"] for s in healthy)
+    if load:
+        result["http_probes_per_sec"] = load_stats["probes_per_sec"]
+    return result
+
+
+# ---------------------------------------------------------
+# Results
+# ---------------------------------------------------------
+
+def metadata():
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                         stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        commit = None
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "platform": platform.platform(),
+    }
+
+
+def flatten(results):
+    """{(section, name, metric): value} for every numeric result."""
+    flat = {}
+    for name, r in results.get("micro", {}).items():
+        flat[("micro", name, "ns_per_op")] = r["ns_per_op"]
+    for name, r in results.get("scenarios", {}).items():
+        for metric, value in r.items():
+            if isinstance(value, (int, float)) and metric != "errors":
+                flat[("scenarios", name, metric)] = value
+    return flat
+
+
+def compare(baseline, current, threshold):
+    base = flatten(baseline)
+    cur = flatten(current)
+    regressions = []
+    rows = []
+    for key in sorted(set(base) & set(cur)):
+        b, c = base[key], cur[key]
+        if b == 0:
+            change = 0.0 if c == 0 else float("inf")
+        else:
+            change = (c - b) / abs(b)
+        worse = -change if key[2] in HIGHER_IS_BETTER else change
+        flag = "REGRESSION" if worse > threshold else ("improved" if worse < -threshold else "")
+        if flag == "REGRESSION":
+            regressions.append(key)
+        rows.append((f"{key[0]}/{key[1]}/{key[2]}", b, c, change, flag))
+
+    width = max((len(r[0]) for r in rows), default=10)
+    print(f"{'result':<{width}}  {'baseline':>12}  {'current':>12}  {'change':>8}")
+    for name, b, c, change, flag in rows:
+        print(f"{name:<{width}}  {b:>12.3f}  {c:>12.3f}  {change:>+7.1%}  {flag}")
+    return regressions
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_run = sub.add_parser("run", help="Run benchmarks and write results JSON")
+    p_run.add_argument("--output", default=os.path.join(ROOT, "bench-results", f"bench-{int(time.time())}.json"))
+    p_run.add_argument("--micro-only", action="store_true", help="Skip the end-to-end scenarios")
+    p_run.add_argument("--scenario", action="append", choices=sorted(SCENARIOS), help="Only run these scenarios")
+    p_run.add_argument("--duration", type=float, default=10.0, help="Seconds per scenario")
+    p_run.add_argument("--scale", type=float, default=1.0, help="Multiply microbenchmark iteration counts")
+    p_run.add_argument("--config", type=json.loads, default={}, metavar="JSON",
+                       help='Extra bridge config for the scenarios, e.g. \'{"ws_transport": {"coalesce": false}}\'')
+    p_run.add_argument("--endpoint", choices=("wss", "ws", "unix"), default="wss",
+                       help="How mock sessions connect: wss on 8181, or a local listener (ws on 127.0.0.1, Unix socket)")
+
+    p_cmp = sub.add_parser("compare", help="Compare results against a baseline")
+    p_cmp.add_argument("baseline")
+    p_cmp.add_argument("current")
+    p_cmp.add_argument("--threshold", type=float, default=0.10, help="Allowed relative slowdown (0.10 = 10%%)")
+    args = parser.parse_args()
+
+    if args.command == "compare":
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        with open(args.current) as f:
+            current = json.load(f)
+        regressions = compare(baseline, current, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}")
+            sys.exit(1)
+        return
+
+    with tempfile.TemporaryDirectory(prefix="spacemouse-bench-") as config_home:
+        main = import_bridge(config_home)
+        results = {"meta": dict(metadata(), bridge_config=args.config, endpoint=args.endpoint),
+                   "micro": micro_benchmarks(main, args.scale), "scenarios": {}}
+        if not args.micro_only:
+            main.ensure_ssl_certs(main.CERT_FILE, main.KEY_FILE)
+            for name in args.scenario or sorted(SCENARIOS):
+                print(f"Running scenario {name} ({args.duration:.0f}s)...", file=sys.stderr)
+                results["scenarios"][name] = run_scenario(main, name, SCENARIOS[name], config_home, args.duration,
+                                                          args.config, args.endpoint)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=4)
+    print(json.dumps(results, indent=4))
+    print(f"Results written to {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main_cli()
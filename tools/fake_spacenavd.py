@@ -0,0 +1,287 @@
+"""
+Synthetic spacenavd for benchmarking without hardware.
+
+Serves the spacenavd Unix socket protocol (v0, 32-byte packets) consumed by
+spnav_wrapper and spacenav-ws-ref, streaming generated motion at a fixed
+rate (1 Hz .. 10 kHz) to every connected client, like spacenavd does.
+
+Patterns:
+    sine     smooth motion on all six axes
+    burst    200 ms full-scale pushes on a random axis, then 800 ms idle
+    hold     5 s holds at 60% deflection, moving to the next axis each time
+    noise    small values around the default deadzone (+/- 15)
+    mix      cycles through the patterns above every 5 s
+Buttons can be interleaved with --buttons SECONDS.
+
+Point the bridge at it with "spacenav_socket" in config.json:
+
+    python tools/fake_spacenavd.py --socket /tmp/spnav.sock --rate 1000 --pattern mix
+    # config.json: { ..., "spacenav_socket": "/tmp/spnav.sock" }
+
+Raw captures (consecutive 32-byte packets) can be taken from a real daemon
+with --capture and streamed back with --replay.
+"""
+import argparse
+import logging
+import math
+import os
+import random
+import socket
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from spnav_wrapper import PACKET, PACKET_SIZE, PROTO_MOTION, PROTO_PRESS, PROTO_RELEASE, SPNAV_SOCKET_PATH
+
+# libspnav >= 1.0 may send tagged requests (protocol negotiation, device queries).
+# We only speak v0 and answer those with an error status so the client falls back.
+REQ_TAG = 0x7faa0000
+REQ_TAG_MASK = 0xffff0000
+FULL_SCALE = 350
+PATTERNS = ("sine", "burst", "hold", "noise")
+
+
+def motion(x=0, y=0, z=0, rx=0, ry=0, rz=0, period=1):
+    return PACKET.pack(PROTO_MOTION, int(x), int(y), int(z), int(rx), int(ry), int(rz), period)
+
+
+def button(bnum, press):
+    return PACKET.pack(PROTO_PRESS if press else PROTO_RELEASE, bnum, 0, 0, 0, 0, 0, 0)
+
+
+class MotionGenerator:
+    """Returns the packet for tick i (at `rate` ticks per second), or None for no packet."""
+
+    def __init__(self, pattern, rate, seed=0):
+        self.pattern = pattern
+        self.rate = rate
+        self.period_ms = max(1, round(1000 / rate))
+        self.rng = random.Random(seed)
+        self.burst_axis = 0
+        self.was_active = False
+
+    def __call__(self, tick):
+        t = tick / self.rate
+        pattern = self.pattern
+        if pattern == "mix":
+            pattern = PATTERNS[int(t // 5) % len(PATTERNS)]
+        axes = getattr(self, f"_{pattern}")(t)
+        if axes is None:
+            # spacenavd sends one zero packet when the cap returns to rest, then goes quiet
+            if self.was_active:
+                self.was_active = False
+                return motion(period=self.period_ms)
+            return None
+        self.was_active = True
+        return motion(*axes, period=self.period_ms)
+
+    def _sine(self, t):
+        return [FULL_SCALE * math.sin(2 * math.pi * 0.5 * t + k * math.pi / 3) for k in range(6)]
+
+    def _burst(self, t):
+        phase = t % 1.0
+        if phase >= 0.2:
+            return None
+        if phase < 1.0 / self.rate:
+            self.burst_axis = self.rng.randrange(6)
+        axes = [0] * 6
+        axes[self.burst_axis] = FULL_SCALE * self.rng.choice((-1, 1))
+        return axes
+
+    def _hold(self, t):
+        cycle, phase = divmod(t, 6.0)
+        if phase >= 5.0:
+            return None
+        axes = [0] * 6
+        axes[int(cycle) % 6] = 0.6 * FULL_SCALE
+        return axes
+
+    def _noise(self, t):
+        return [self.rng.randint(-15, 15) for _ in range(6)]
+
+
+class ReplayGenerator:
+    """Streams a raw capture file packet by packet, looping at the end."""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            data = f.read()
+        count = len(data) // PACKET_SIZE
+        if not count:
+            raise ValueError(f"{path} holds no complete packets")
+        self.packets = [data[i * PACKET_SIZE:(i + 1) * PACKET_SIZE] for i in range(count)]
+
+    def __call__(self, tick):
+        return self.packets[tick % len(self.packets)]
+
+
+class FakeSpacenavd:
+    def __init__(self, socket_path, generator, rate, button_interval=0.0, buttons=2):
+        self.socket_path = socket_path
+        self.generator = generator
+        self.rate = rate
+        self.button_interval = button_interval
+        self.buttons = buttons
+        self.clients = []
+        self.lock = threading.Lock()
+        self.running = True
+        self.sent = 0
+        self.server = None
+
+    def serve(self):
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.server.bind(self.socket_path)
+        self.server.listen(16)
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+        logging.info(f"Serving on {self.socket_path} at {self.rate} Hz")
+
+    def close(self):
+        self.running = False
+        with self.lock:
+            for c in self.clients:
+                c.close()
+            self.clients.clear()
+        if self.server:
+            self.server.close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+    def _accept_loop(self):
+        while self.running:
+            try:
+                conn, _ = self.server.accept()
+            except OSError:
+                return
+            with self.lock:
+                self.clients.append(conn)
+            logging.info(f"Client connected ({len(self.clients)} total)")
+            threading.Thread(target=self._request_loop, args=(conn,), daemon=True).start()
+
+    def _request_loop(self, conn):
+        # Answer tagged requests with an error status, discard anything else
+        while self.running:
+            try:
+                data = conn.recv(PACKET_SIZE, socket.MSG_WAITALL)
+            except OSError:
+                return
+            if len(data) < PACKET_SIZE:
+                return
+            req = list(PACKET.unpack(data))
+            if (req[0] & REQ_TAG_MASK) == REQ_TAG:
+                req[1:8] = [0, 0, 0, 0, 0, 0, -1]
+                self._send_to(conn, PACKET.pack(*req))
+
+    def _send_to(self, conn, data):
+        try:
+            conn.sendall(data)
+        except OSError:
+            with self.lock:
+                if conn in self.clients:
+                    self.clients.remove(conn)
+            conn.close()
+            logging.info("Client disconnected")
+
+    def broadcast(self, data):
+        with self.lock:
+            clients = list(self.clients)
+        for conn in clients:
+            self._send_to(conn, data)
+
+    def stream(self, duration=0.0):
+        """Generate packets on a fixed schedule; late ticks are sent in one batch."""
+        period = 1.0 / self.rate
+        start = time.perf_counter()
+        next_t = start
+        next_button = start + self.button_interval if self.button_interval else math.inf
+        button_id = 0
+        tick = 0
+        while self.running:
+            now = time.perf_counter()
+            if duration and now - start >= duration:
+                break
+            if now < next_t:
+                time.sleep(next_t - now)
+                now = time.perf_counter()
+
+            batch = []
+            while next_t <= now:
+                packet = self.generator(tick)
+                if packet:
+                    batch.append(packet)
+                tick += 1
+                next_t += period
+            if now >= next_button:
+                batch.append(button(button_id, True))
+                batch.append(button(button_id, False))
+                button_id = (button_id + 1) % self.buttons
+                next_button += self.button_interval
+            if batch and self.clients:
+                self.broadcast(b"".join(batch))
+                self.sent += len(batch)
+        return time.perf_counter() - start
+
+
+def capture(source, output, duration):
+    """Record raw packets from a real spacenavd."""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.connect(source)
+    sock.settimeout(0.5)
+    count = 0
+    deadline = time.monotonic() + duration if duration else math.inf
+    with open(output, "wb") as f:
+        try:
+            while time.monotonic() < deadline:
+                try:
+                    data = sock.recv(PACKET_SIZE, socket.MSG_WAITALL)
+                except socket.timeout:
+                    continue
+                if len(data) < PACKET_SIZE:
+                    break
+                f.write(data)
+                count += 1
+        except KeyboardInterrupt:
+            pass
+    logging.info(f"Captured {count} packets to {output}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--socket", default="/tmp/spnav-fake.sock", help="Socket path to serve on")
+    parser.add_argument("--rate", type=float, default=1000.0, help="Motion packets per second (1 - 10000)")
+    parser.add_argument("--pattern", default="mix", choices=PATTERNS + ("mix",))
+    parser.add_argument("--replay", help="Stream a raw capture file instead of a generated pattern")
+    parser.add_argument("--buttons", type=float, default=0.0, metavar="SECONDS",
+                        help="Press/release a button every SECONDS (0 = never)")
+    parser.add_argument("--duration", type=float, default=0.0, help="Stop after this many seconds (0 = run forever)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--capture", metavar="FILE", help="Record raw packets from --source into FILE and exit")
+    parser.add_argument("--source", default=SPNAV_SOCKET_PATH, help="Real spacenavd socket for --capture")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - FakeSpacenavd - %(levelname)s - %(message)s')
+
+    if args.capture:
+        capture(args.source, args.capture, args.duration)
+        return
+
+    if not 1 <= args.rate <= 10000:
+        parser.error("--rate out of range")
+    generator = ReplayGenerator(args.replay) if args.replay else MotionGenerator(args.pattern, args.rate, args.seed)
+    daemon = FakeSpacenavd(args.socket, generator, args.rate, args.buttons)
+    daemon.serve()
+    elapsed = 0.0
+    try:
+        elapsed = daemon.stream(args.duration)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        daemon.close()
+    if elapsed:
+        logging.info(f"Sent {daemon.sent} packets in {elapsed:.1f}s ({daemon.sent / elapsed:.0f}/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+"""
+Compare the spacenavd path with the direct evdev backend (hid_backend.py)
+on the same input stream.
+
+The stream is an evdev recording (`python hid_backend.py record`) or, by
+default, fake_spacenavd's sine pattern encoded as input events. A writer
+thread plays it into a FIFO in real time and stamps every sample. Two
+readers take it from there:
+
+    spacenavd  a relay process decodes the FIFO the way spacenavd does and
+               forwards v0 packets over a Unix socket to SpnavConnection
+    evdev      EvdevConnection reads the FIFO itself
+
+For each, the per-sample latency (FIFO write to decoded SpnavEvent) and
+the CPU time per 1000 samples, relay process included, are reported. Both
+readers must decode identical motion; a mismatch is reported as an error.
+
+    python tools/hid_bench.py --rate 1000 --duration 10
+    python tools/hid_bench.py --recording session.evdev --output hid.json
+"""
+import argparse
+import json
+import math
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+TOOLS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(TOOLS))
+
+import hid_backend
+import spnav_wrapper
+from hid_backend import INPUT_EVENT, EV_ABS, EV_SYN, SYN_REPORT, EvdevDecoder
+
+FULL_SCALE = 350
+
+
+def synthetic_samples(rate, duration):
+    """Sine motion on all six axes as (input_events bytes) per SYN_REPORT."""
+    samples = []
+    for i in range(int(rate * duration)):
+        t = i / rate
+        sec, usec = int(t), int((t % 1) * 1e6)
+        data = b"".join(INPUT_EVENT.pack(sec, usec, EV_ABS, axis,
+                                         int(FULL_SCALE * math.sin(2 * math.pi * 0.5 * t + axis * math.pi / 3)))
+                        for axis in range(6))
+        samples.append(data + INPUT_EVENT.pack(sec, usec, EV_SYN, SYN_REPORT, 0))
+    return samples
+
+
+def recorded_samples(path):
+    """Split a recording into SYN_REPORT-terminated samples, keeping their timestamps."""
+    with open(path, "rb") as f:
+        data = f.read()
+    samples, start = [], 0
+    size = INPUT_EVENT.size
+    for offset in range(0, len(data) - len(data) % size, size):
+        _sec, _usec, ev_type, code, _value = INPUT_EVENT.unpack_from(data, offset)
+        if ev_type == EV_SYN and code == SYN_REPORT:
+            samples.append(data[start:offset + size])
+            start = offset + size
+    return samples
+
+
+def sample_time(sample):
+    sec, usec = INPUT_EVENT.unpack_from(sample, 0)[:2]
+    return sec + usec / 1e6
+
+
+def expected_motion(samples):
+    """Axes of the motion event each sample produces, or None (buttons only)."""
+    decoder = EvdevDecoder()
+    expected = []
+    for sample in samples:
+        motions = [e for e in decoder.feed(sample) if e.type == spnav_wrapper.SPNAV_EVENT_MOTION]
+        expected.append(_axes(motions[-1]) if motions else None)
+    return expected
+
+
+def _axes(event):
+    m = event.motion
+    return (m.x, m.y, m.z, m.rx, m.ry, m.rz)
+
+
+def writer(fifo, samples, rate, stamps):
+    """Play samples into the FIFO, on the recording's clock or at `rate`."""
+    fd = os.open(fifo, os.O_WRONLY)
+    try:
+        t0 = time.perf_counter()
+        base = sample_time(samples[0])
+        for i, sample in enumerate(samples):
+            due = t0 + (sample_time(sample) - base if rate is None else i / rate)
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            stamps.append(time.perf_counter_ns())
+            os.write(fd, sample)
+    finally:
+        os.close(fd)
+
+
+def relay(fifo, socket_path):
+    """What spacenavd does for this benchmark: evdev in, v0 packets out to one client. Prints its CPU seconds."""
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(socket_path)
+    server.listen(1)
+    client, _ = server.accept()
+    decoder = EvdevDecoder()
+    fd = os.open(fifo, os.O_RDONLY)
+    pack = spnav_wrapper.PACKET.pack
+    cpu0 = time.process_time()
+    try:
+        while True:
+            data = os.read(fd, INPUT_EVENT.size * 64)
+            if not data:
+                break
+            for event in decoder.feed(data):
+                if event.type == spnav_wrapper.SPNAV_EVENT_MOTION:
+                    m = event.motion
+                    client.sendall(pack(spnav_wrapper.PROTO_MOTION, m.x, m.y, m.z, m.rx, m.ry, m.rz, m.period))
+                else:
+                    proto = spnav_wrapper.PROTO_PRESS if event.button.press else spnav_wrapper.PROTO_RELEASE
+                    client.sendall(pack(proto, event.button.bnum, 0, 0, 0, 0, 0, 0))
+    finally:
+        os.close(fd)
+        client.close()
+        server.close()
+    # Interpreter startup is not part of the per-sample cost
+    print(time.process_time() - cpu0)
+
+
+def percentiles(values):
+    values = sorted(values)
+    if not values:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0}
+    return {f"p{int(q * 100)}": round(values[min(len(values) - 1, int(q * len(values)))], 1)
+            for q in (0.50, 0.95, 0.99)}
+
+
+def run_path(path_name, samples, expected, rate):
+    workdir = tempfile.mkdtemp(prefix="hid-bench-")
+    fifo = os.path.join(workdir, "stream.fifo")
+    os.mkfifo(fifo)
+    stamps = []
+    relay_proc = None
+    if path_name == "spacenavd":
+        socket_path = os.path.join(workdir, "spnav.sock")
+        relay_proc = subprocess.Popen([sys.executable, os.path.abspath(__file__), "relay", fifo, socket_path],
+                                      stdout=subprocess.PIPE)
+        while not os.path.exists(socket_path):
+            time.sleep(0.01)
+        conn = spnav_wrapper.SpnavConnection(socket_path)
+    else:
+        conn = hid_backend.EvdevConnection(fifo)
+
+    thread = threading.Thread(target=writer, args=(fifo, samples, rate, stamps), daemon=True)
+    thread.start()
+    conn.open()
+    wanted = [axes for axes in expected if axes is not None]
+    stamp_index = [i for i, axes in enumerate(expected) if axes is not None]
+    latencies_us = []
+    mismatches = 0
+    cpu0 = time.thread_time()
+    try:
+        while len(latencies_us) < len(wanted):
+            event = conn.wait_event()
+            if event.type != spnav_wrapper.SPNAV_EVENT_MOTION:
+                continue
+            now = time.perf_counter_ns()
+            k = len(latencies_us)
+            latencies_us.append((now - stamps[stamp_index[k]]) / 1000.0)
+            if _axes(event) != wanted[k]:
+                mismatches += 1
+    finally:
+        reader_cpu = time.thread_time() - cpu0
+        conn.close()
+        thread.join()
+        relay_cpu = float(relay_proc.communicate(timeout=10)[0] or 0) if relay_proc else 0.0
+        shutil.rmtree(workdir, ignore_errors=True)
+    per_k = 1000.0 / max(1, len(latencies_us))
+    return {
+        "samples": len(latencies_us),
+        "mismatches": mismatches,
+        "latency_us": percentiles(latencies_us),
+        "cpu_ms_per_1k_samples": {
+            "reader": round(reader_cpu * 1000 * per_k, 3),
+            "relay": round(relay_cpu * 1000 * per_k, 3),
+            "total": round((reader_cpu + relay_cpu) * 1000 * per_k, 3),
+        },
+    }
+
+
+def main():
+    if len(sys.argv) == 4 and sys.argv[1] == "relay":
+        relay(sys.argv[2], sys.argv[3])
+        return
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--recording", help="evdev recording from `hid_backend.py record` (default: synthetic)")
+    parser.add_argument("--rate", type=float, default=1000.0, help="Samples per second for the synthetic stream")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds of synthetic stream")
+    parser.add_argument("--output", help="Also write the results JSON to this file")
+    args = parser.parse_args()
+
+    if args.recording:
+        samples, rate = recorded_samples(args.recording), None
+    else:
+        samples, rate = synthetic_samples(args.rate, args.duration), args.rate
+    if not samples:
+        sys.exit("No samples in the stream")
+    expected = expected_motion(samples)
+    results = {
+        "stream": args.recording or f"synthetic sine, {args.rate:g} Hz",
+        "paths": {name: run_path(name, samples, expected, rate) for name in ("spacenavd", "evdev")},
+    }
+    text = json.dumps(results, indent=4)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
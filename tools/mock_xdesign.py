@@ -0,0 +1,256 @@
+"""
+Mock xDesign / navlib client for benchmarks and regression runs.
+
+Connects to the bridge like a real xDesign tab: WAMP handshake over
+/3dconnexion/nlproxy, 3dx_rpc:create for 3dmouse and 3dcontroller, SUBSCRIBE
+to the controller topic, focus update. It then answers the bridge's
+self:read / self:update calls from a simulated scene. Response delay, jitter
+and the tab's frame rate can be set. With --fps, replies are held until the
+next frame boundary, as a tab answering from its render loop would.
+--slow-sessions makes the last N tabs answer after --slow-delay-ms instead,
+like a backgrounded tab.
+
+    python tools/mock_xdesign.py --sessions 4 --duration 30 --delay-ms 2 --jitter-ms 1 --fps 60
+    python tools/mock_xdesign.py --sessions 2 --slow-sessions 1 --slow-delay-ms 2000
+
+Without TLS, through the bridge's "local_listeners":
+
+    python tools/mock_xdesign.py --url ws://127.0.0.1:8182/3dconnexion/nlproxy
+    python tools/mock_xdesign.py --unix $XDG_RUNTIME_DIR/spacemouse-bridge/wamp.sock
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import random
+import ssl
+import time
+
+from aiohttp import ClientSession, UnixConnector, WSMsgType
+
+WAMP_WELCOME = 0
+WAMP_PREFIX = 1
+WAMP_CALL = 2
+WAMP_CALLRESULT = 3
+WAMP_CALLERROR = 4
+WAMP_SUBSCRIBE = 5
+WAMP_EVENT = 8
+
+DEFAULT_URL = "wss://localhost:8181/3dconnexion/nlproxy"
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def client_ssl_context():
+    ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    ctx.check_hostname = False
+    ctx.verify_mode = ssl.CERT_NONE
+    return ctx
+
+
+class Scene:
+    """The bits of an xDesign viewport the bridge reads and writes."""
+
+    def __init__(self):
+        # Row-vector affine (translation in the last row), camera 500 units back
+        self.affine = [1.0, 0.0, 0.0, 0.0,
+                       0.0, 1.0, 0.0, 0.0,
+                       0.0, 0.0, 1.0, 0.0,
+                       0.0, 0.0, 500.0, 1.0]
+        self.perspective = True
+        self.extents = [-50.0, -50.0, -50.0, 50.0, 50.0, 50.0]
+        self.motion = False
+
+    def read(self, prop):
+        if prop == "view.affine":
+            return self.affine
+        if prop == "view.perspective":
+            return self.perspective
+        if prop == "model.extents":
+            return self.extents
+        return None
+
+    def update(self, prop, value):
+        if prop == "view.affine":
+            self.affine = value
+        elif prop == "motion":
+            self.motion = value
+
+
+class MockSession:
+    def __init__(self, url, delay=0.0, jitter=0.0, fps=0.0, name="mock-xdesign"):
+        self.url = url
+        self.delay = delay
+        self.jitter = jitter
+        self.fps = fps
+        self.name = name
+        self.scene = Scene()
+        self.ws = None
+        self.topic = None
+        self.reads = 0
+        self.updates = 0
+        self.frame_times = []  # monotonic time of every view.affine write
+        self._seq = 0
+
+    def _call_id(self):
+        self._seq += 1
+        return f"0.{self.name}.{self._seq}"
+
+    async def _call(self, proc, *args):
+        call_id = self._call_id()
+        await self.ws.send_str(json.dumps([WAMP_CALL, call_id, proc, *args]))
+        while True:
+            msg = await self.ws.receive()
+            if msg.type != WSMsgType.TEXT:
+                raise ConnectionError(f"Connection lost during {proc}: {msg.type}")
+            data = json.loads(msg.data)
+            if data[0] in (WAMP_CALLRESULT, WAMP_CALLERROR) and data[1] == call_id:
+                if data[0] == WAMP_CALLERROR:
+                    raise RuntimeError(f"{proc} failed: {data[2:]}")
+                return data[2]
+
+    async def handshake(self):
+        msg = await self.ws.receive()
+        welcome = json.loads(msg.data)
+        if welcome[0] != WAMP_WELCOME:
+            raise RuntimeError(f"Expected WELCOME, got {welcome!r}")
+
+        # Same sequence as the captured navlib handshake
+        for prefix, uri in (("3dx_rpc", "wss://127.51.68.120/3dconnexion#"),
+                            ("3dconnexion", "wss://127.51.68.120/3dconnexion"),
+                            ("self", "https://localhost/mock-xdesign")):
+            await self.ws.send_str(json.dumps([WAMP_PREFIX, prefix, uri]))
+
+        mouse = await self._call("3dx_rpc:create", "3dconnexion:3dmouse", "0.3.11")
+        controller = await self._call("3dx_rpc:create", "3dconnexion:3dcontroller",
+                                      mouse["connexion"], {"version": 0, "name": self.name})
+        self.topic = f"3dconnexion:3dcontroller/{controller['instance']}"
+        await self.ws.send_str(json.dumps([WAMP_SUBSCRIBE, self.topic]))
+        await self._call("3dx_rpc:update", self.topic, {"focus": True})
+
+    def _reply_at(self, loop):
+        t = loop.time() + max(0.0, self.delay + random.uniform(-self.jitter, self.jitter))
+        if self.fps > 0:
+            period = 1.0 / self.fps
+            t = math.ceil(t / period) * period
+        return t
+
+    def _answer(self, call):
+        # [2, callID, method, "", property, (value)]
+        call_id, method = call[1], call[2]
+        args = call[4:]
+        if method == "self:read":
+            self.reads += 1
+            return [WAMP_CALLRESULT, call_id, self.scene.read(args[0])]
+        if method == "self:update":
+            self.updates += 1
+            self.scene.update(args[0], args[1] if len(args) > 1 else None)
+            if args[0] == "view.affine":
+                self.frame_times.append(time.monotonic())
+            return [WAMP_CALLRESULT, call_id, None]
+        return [WAMP_CALLERROR, call_id, "unknown method"]
+
+    def _send_later(self, loop, reply):
+        loop.call_at(self._reply_at(loop), lambda: asyncio.ensure_future(self._send(reply)))
+
+    async def _send(self, reply):
+        if not self.ws.closed:
+            await self.ws.send_str(json.dumps(reply))
+
+    async def run(self, session, ssl_context, duration):
+        loop = asyncio.get_running_loop()
+        async with session.ws_connect(self.url, protocols=("wamp",), ssl=ssl_context) as ws:
+            self.ws = ws
+            await self.handshake()
+            logging.info(f"{self.name}: subscribed to {self.topic}")
+            deadline = loop.time() + duration
+            while True:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    msg = await ws.receive(timeout=remaining)
+                except asyncio.TimeoutError:
+                    break
+                if msg.type != WSMsgType.TEXT:
+                    logging.warning(f"{self.name}: connection closed ({msg.type})")
+                    break
+                data = json.loads(msg.data)
+                if data[0] == WAMP_EVENT and isinstance(data[2], list) and data[2][0] == WAMP_CALL:
+                    self._send_later(loop, self._answer(data[2]))
+
+    def stats(self):
+        intervals = sorted(b - a for a, b in zip(self.frame_times, self.frame_times[1:]))
+        return {
+            "delay_ms": round(self.delay * 1000, 3),
+            "reads": self.reads,
+            "updates": self.updates,
+            "frames": len(self.frame_times),
+            "frame_interval_ms": {
+                "p50": round(percentile(intervals, 0.50) * 1000, 3),
+                "p95": round(percentile(intervals, 0.95) * 1000, 3),
+                "p99": round(percentile(intervals, 0.99) * 1000, 3),
+            },
+        }
+
+
+async def run_sessions(url, sessions=1, duration=10.0, delay=0.0, jitter=0.0, fps=0.0, slow=0, slow_delay=0.0,
+                       unix=None):
+    """
+    Run several mock tabs concurrently (the last `slow` answering after
+    `slow_delay`) and return aggregated stats. With `unix`, connect to that
+    socket instead of url's host.
+    """
+    if unix:
+        url = "ws://localhost/3dconnexion/nlproxy"
+    ssl_context = client_ssl_context() if url.startswith("wss") else False
+    mocks = [MockSession(url, slow_delay if i >= sessions - slow else delay, jitter, fps, name=f"mock{i}")
+             for i in range(sessions)]
+    async with ClientSession(connector=UnixConnector(unix) if unix else None) as session:
+        results = await asyncio.gather(*(m.run(session, ssl_context, duration) for m in mocks),
+                                       return_exceptions=True)
+    errors = [repr(r) for r in results if isinstance(r, Exception)]
+    per_session = [m.stats() for m in mocks]
+    frames = sum(s["frames"] for s in per_session)
+    return {
+        "sessions": sessions,
+        "duration_s": duration,
+        "errors": errors,
+        "frames": frames,
+        "frames_per_sec": round(frames / duration, 1) if duration else 0.0,
+        "per_session": per_session,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=DEFAULT_URL, help="nlproxy WebSocket URL")
+    parser.add_argument("--unix", help="Connect through the bridge's Unix socket instead of --url")
+    parser.add_argument("--sessions", type=int, default=1, help="Simultaneous mock tabs")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds to stay connected")
+    parser.add_argument("--delay-ms", type=float, default=0.0, help="Base reply delay")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Uniform +/- jitter on the reply delay")
+    parser.add_argument("--fps", type=float, default=0.0, help="Answer only on frame boundaries (0 = immediately)")
+    parser.add_argument("--slow-sessions", type=int, default=0, help="How many of the tabs answer slowly")
+    parser.add_argument("--slow-delay-ms", type=float, default=2000.0, help="Reply delay of the slow tabs")
+    parser.add_argument("--output", help="Also write the stats JSON to this file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - MockXDesign - %(levelname)s - %(message)s')
+    stats = asyncio.run(run_sessions(args.url, args.sessions, args.duration,
+                                     args.delay_ms / 1000.0, args.jitter_ms / 1000.0, args.fps,
+                                     args.slow_sessions, args.slow_delay_ms / 1000.0, args.unix))
+    text = json.dumps(stats, indent=4)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+
+
+if __name__ == "__main__":
+    main()
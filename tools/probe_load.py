@@ -0,0 +1,94 @@
+"""
+Load test for the xDesign discovery probe.
+
+Hammers GET / and GET /3dconnexion/nlproxy on a running bridge and reports
+how many probes per second it serves, plus latency percentiles.
+
+    python tools/probe_load.py --concurrency 32 --duration 10
+
+--new-connections closes the connection after every request, so each probe
+pays for a TCP connect and TLS handshake (the worst case for the bridge's
+loop; bench.py's http_load scenario uses it to measure motion jitter).
+"""
+import argparse
+import asyncio
+import json
+import ssl
+import time
+
+from aiohttp import ClientSession, TCPConnector
+
+PROBE_PATHS = ("/", "/3dconnexion/nlproxy")
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, int(q * len(sorted_values)))
+    return sorted_values[idx]
+
+
+async def worker(session, base_url, deadline, latencies, errors):
+    i = 0
+    while time.perf_counter() < deadline:
+        path = PROBE_PATHS[i % len(PROBE_PATHS)]
+        i += 1
+        t0 = time.perf_counter()
+        try:
+            async with session.get(base_url + path, headers={"Origin": "https://localhost"}) as resp:
+                await resp.read()
+                if resp.status != 200:
+                    errors.append(resp.status)
+                    continue
+        except Exception as e:
+            errors.append(str(e))
+            continue
+        latencies.append(time.perf_counter() - t0)
+
+
+async def run(args):
+    ssl_context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    ssl_context.check_hostname = False
+    ssl_context.verify_mode = ssl.CERT_NONE
+
+    latencies = []
+    errors = []
+    connector = TCPConnector(ssl=ssl_context if args.url.startswith("https") else False, limit=args.concurrency,
+                             force_close=args.new_connections)
+    async with ClientSession(connector=connector) as session:
+        start = time.perf_counter()
+        deadline = start + args.duration
+        await asyncio.gather(*(worker(session, args.url, deadline, latencies, errors)
+                               for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "url": args.url,
+        "concurrency": args.concurrency,
+        "new_connections": args.new_connections,
+        "duration_s": round(elapsed, 3),
+        "requests": len(latencies),
+        "errors": len(errors),
+        "probes_per_sec": round(len(latencies) / elapsed, 1),
+        "latency_ms": {
+            "p50": round(percentile(latencies, 0.50) * 1000, 3),
+            "p95": round(percentile(latencies, 0.95) * 1000, 3),
+            "p99": round(percentile(latencies, 0.99) * 1000, 3),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="https://localhost:8181", help="Bridge base URL")
+    parser.add_argument("--concurrency", type=int, default=16, help="Parallel probe loops")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds to run")
+    parser.add_argument("--new-connections", action="store_true", help="New TCP/TLS connection per request")
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(run(args)), indent=4))
+
+
+if __name__ == "__main__":
+    main()
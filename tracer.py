@@ -0,0 +1,89 @@
+"""
+End-to-end latency tracer for the motion pipeline.
+
+Each spacenavd sample is stamped with time.monotonic_ns() when it is read.
+process_motion adds a timestamp after every pipeline step and hands the
+complete tuple to LatencyTracer.record(), which stores it in a fixed-size
+ring buffer. Durations, percentiles and Chrome trace-event JSON
+(chrome://tracing, ui.perfetto.dev) are only computed when someone asks.
+"""
+import os
+import time
+
+# Timestamps recorded per frame, in pipeline order
+MARKS = (
+    "ingest",           # read from spacenavd (spacenav_thread_func)
+    "dequeue",          # taken off event_queue (broadcast_loop)
+    "start",            # process_motion running for this controller
+    "read.perspective", # CALLRESULT for self:read view.perspective
+    "read.affine",      # CALLRESULT for self:read view.affine
+    "read.extents",     # CALLRESULT for self:read model.extents
+    "compute",          # new affine computed
+    "write.motion",     # CALLRESULT for self:update motion
+    "write.affine",     # CALLRESULT for self:update view.affine
+)
+
+# Stage i spans MARKS[i] -> MARKS[i + 1]
+STAGES = ("queue", "dispatch", "read.perspective", "read.affine", "read.extents",
+          "compute", "write.motion", "write.affine")
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def _quantile(sorted_values, q):
+    if not sorted_values:
+        return 0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+class LatencyTracer:
+    def __init__(self, capacity=4096):
+        self.capacity = capacity
+        self.frames = [None] * capacity
+        self.pos = 0
+        self.total = 0
+        self.origin_ns = time.monotonic_ns()
+
+    def record(self, marks, controller=0):
+        """Store one frame: a tuple of len(MARKS) monotonic_ns timestamps."""
+        self.frames[self.pos] = (controller, marks)
+        self.pos = (self.pos + 1) % self.capacity
+        self.total += 1
+
+    def snapshot(self):
+        """Recorded frames, oldest first."""
+        if self.total < self.capacity:
+            return self.frames[:self.pos]
+        return self.frames[self.pos:] + self.frames[:self.pos]
+
+    def durations(self):
+        """Per-stage durations in ns, plus 'total' (ingest -> acknowledged write)."""
+        frames = self.snapshot()
+        result = {stage: [] for stage in STAGES}
+        result["total"] = []
+        for _, marks in frames:
+            for i, stage in enumerate(STAGES):
+                result[stage].append(marks[i + 1] - marks[i])
+            result["total"].append(marks[-1] - marks[0])
+        return result
+
+    def summary(self):
+        """p50/p95/p99 per stage, in milliseconds."""
+        summary = {"frames": min(self.total, self.capacity)}
+        for stage, values in self.durations().items():
+            values.sort()
+            summary[stage] = {f"p{int(q * 100)}": _quantile(values, q) / 1e6 for q in QUANTILES}
+        return summary
+
+    def chrome_trace(self):
+        """Recorded frames as Chrome trace-event JSON (a dict ready for json.dumps)."""
+        pid = os.getpid()
+        events = [{"name": "process_name", "ph": "M", "pid": pid, "args": {"name": "spacemouse-bridge"}}]
+        for controller, marks in self.snapshot():
+            ts = [(m - self.origin_ns) / 1000.0 for m in marks]
+            events.append({"name": "frame", "cat": "motion", "ph": "X", "pid": pid, "tid": controller,
+                           "ts": ts[0], "dur": ts[-1] - ts[0]})
+            for i, stage in enumerate(STAGES):
+                events.append({"name": stage, "cat": "motion", "ph": "X", "pid": pid, "tid": controller,
+                               "ts": ts[i], "dur": ts[i + 1] - ts[i]})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
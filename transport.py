@@ -0,0 +1,148 @@
+"""
+Outbound message path for one nlproxy WebSocket.
+
+Callers hand messages to WampTransport.send() synchronously. A per-session
+writer task sends everything queued during one loop iteration together:
+with TCP_CORK (Linux) the socket is corked for the batch and uncorked once,
+so a frame's self:update calls leave as one TCP segment instead of one per
+TLS record. TCP_NODELAY is forced on so the uncorked batch is not held back
+by Nagle waiting for the client's ACK.
+
+When the client stops reading (a stalled or backgrounded tab) and the
+transport's write buffer passes `high_water`, droppable messages (camera
+updates that the next frame supersedes) are refused instead of queued;
+send() returns False and the caller skips waiting for a reply.
+
+send() must be called on the loop that owns the WebSocket. The motion
+thread (motion_thread.py) uses send_threadsafe(), which decides about
+dropping right away and hands the message to that loop.
+"""
+import asyncio
+import collections
+import logging
+import socket
+
+HIGH_WATER = 64 * 1024
+# WebSocket close codes: server shutting down, unexpected server error
+GOING_AWAY = 1001
+INTERNAL_ERROR = 1011
+# Queued-but-unsent messages allowed before droppable ones are refused
+MAX_QUEUED = 256
+
+
+class WampTransport:
+    def __init__(self, ws, request, coalesce=True, high_water=HIGH_WATER, on_drop=None):
+        self.ws = ws
+        self.coalesce = coalesce
+        self.high_water = high_water
+        self.on_drop = on_drop
+        self.queue = collections.deque()
+        self.sent = 0
+        self.batches = 0
+        self.dropped = 0
+        self.inbox = collections.deque()  # from send_threadsafe(), drained on the loop
+        self._inbox_scheduled = False
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._transport = request.transport
+        self._sock = self._transport.get_extra_info("socket") if self._transport else None
+        self._cork = coalesce and hasattr(socket, "TCP_CORK") and self._is_tcp()
+        if self._is_tcp():
+            try:
+                self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            except OSError as e:
+                logging.debug(f"TCP_NODELAY not set: {e}")
+        self._task = asyncio.create_task(self._writer()) if coalesce else None
+
+    def _is_tcp(self):
+        return self._sock is not None and self._sock.family in (socket.AF_INET, socket.AF_INET6)
+
+    def buffered(self):
+        return self._transport.get_write_buffer_size() if self._transport else 0
+
+    def _drop(self):
+        if len(self.queue) + len(self.inbox) < MAX_QUEUED and self.buffered() <= self.high_water:
+            return False
+        self.dropped += 1
+        if self.on_drop:
+            self.on_drop()
+        return True
+
+    def send(self, text, droppable=False):
+        """Queue a message. Returns False if it was dropped because the client is not keeping up."""
+        if self.ws.closed or (droppable and self._drop()):
+            return False
+        if self._task is not None and self._task.done():
+            return False  # writer is gone, nothing queued would ever be sent
+        if not self.coalesce:
+            # One write per message, as before this module existed (kept for comparison)
+            asyncio.ensure_future(self._send(text))
+            return True
+        self.queue.append(text)
+        self._wakeup.set()
+        return True
+
+    def send_threadsafe(self, text, droppable=False):
+        """send() from another thread. The drop decision uses the buffer sizes as last seen."""
+        if self.ws.closed or (droppable and self._drop()):
+            return False
+        self.inbox.append(text)
+        # Appended before the flag is read, so a drain that already cleared it will run again
+        if not self._inbox_scheduled:
+            self._inbox_scheduled = True
+            self._loop.call_soon_threadsafe(self._drain_inbox)
+        return True
+
+    def _drain_inbox(self):
+        self._inbox_scheduled = False
+        inbox = self.inbox
+        while inbox:
+            self.send(inbox.popleft())
+
+    def close(self):
+        if self._task:
+            self._task.cancel()
+
+    async def shutdown(self, code=GOING_AWAY, message=b"Bridge shutting down"):
+        """Send what is still queued, then close the WebSocket with `code`."""
+        self.close()
+        self._drain_inbox()
+        while self.queue and not self.ws.closed:
+            await self._send(self.queue.popleft())
+        await self.ws.close(code=code, message=message)
+
+    def _set_cork(self, on):
+        try:
+            self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_CORK, 1 if on else 0)
+        except OSError:
+            self._cork = False
+
+    async def _writer(self):
+        queue = self.queue
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            # Woken one iteration after the first send(), so everything
+            # queued in that iteration goes out in this batch
+            if self._cork:
+                self._set_cork(True)
+            try:
+                while queue:
+                    await self._send(queue.popleft())
+            finally:
+                if self._cork:
+                    self._set_cork(False)
+            self.batches += 1
+
+    async def _send(self, text):
+        try:
+            await self.ws.send_str(text)
+            self.sent += 1
+        except (ConnectionError, RuntimeError) as e:
+            logging.debug(f"WebSocket send failed: {e}")
+            self.queue.clear()
+        except Exception as e:
+            # Anything else would end the writer task silently; close the session instead
+            logging.warning(f"WebSocket send failed, closing the session: {e!r}")
+            self.queue.clear()
+            await self.ws.close(code=INTERNAL_ERROR, message=b"Send failed")
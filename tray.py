@@ -7,10 +7,10 @@ import subprocess
 import webbrowser
 import threading
 import time
-import asyncio
-import websockets
 import logging
 
+from status import read_status, socket_path
+
 
 def resource_path(relative_path):
     try:
@@ -20,9 +20,18 @@ def resource_path(relative_path):
     return os.path.join(base_path, relative_path)
 
 # Configuration
-BRIDGE_URL = "wss://localhost:8181"
+STATUS_SOCKET = socket_path()
 ICON_PATH = resource_path(os.path.join("assets", "icon.png"))
 
+# Icon per tray state, rendered once at startup
+STATE_COLORS = {
+    "disconnected": "grey",   # bridge not running
+    "idle": "orange",         # bridge up, no xDesign tab
+    "connected": "green",     # xDesign tab attached
+    "active": "#2196f3",      # motion flowing
+    "error": "red",           # spacenavd missing or errors increasing
+}
+
 # Logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - Tray - %(levelname)s - %(message)s')
 
@@ -30,15 +39,30 @@ class SpaceMouseTray:
     def __init__(self):
         self.icon = None
         self.connected = False
+        self.status = {}
+        self.last_errors = {}
         self.running = True
+        self.shown = None # (state, title) currently on the tray
+        self.shown_perf = None
+        self.base = self.load_base()
+        self.images = {state: self.create_image(color) for state, color in STATE_COLORS.items()}
 
-    def create_image(self, status_color):
-        # If asset icon exists, load it and overlay a status dot
+    def load_base(self):
         try:
             if os.path.exists(ICON_PATH):
                 base = Image.open(ICON_PATH).convert("RGBA")
                 # Resize for tray if needed, typically 64x64 is safe
                 base.thumbnail((64, 64))
+                return base
+        except Exception as e:
+            logging.error(f"Failed to load icon: {e}")
+        return None
+
+    def create_image(self, status_color):
+        # If asset icon exists, overlay a status dot
+        try:
+            if self.base is not None:
+                base = self.base
                 
                 # Create status dot
                 dot = Image.new('RGBA', base.size, (0,0,0,0))
@@ -75,38 +99,77 @@ class SpaceMouseTray:
         self.running = False
         icon.stop()
 
-    async def check_connection(self):
-        import ssl
-        ssl_context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
-        ssl_context.check_hostname = False
-        ssl_context.verify_mode = ssl.CERT_NONE
-
+    def watch_status(self):
+        # The bridge pushes a line per state change; connecting to a missing
+        # socket fails immediately, so retrying is cheap
         while self.running:
             try:
-                async with websockets.connect(BRIDGE_URL, ssl=ssl_context, subprotocols=["3dx-v1"]) as ws:
+                for state in read_status(STATUS_SOCKET):
+                    if not self.connected:
+                        logging.info("Connected to Bridge")
                     self.connected = True
+                    self.last_errors = self.status.get("errors", {})
+                    self.status = state
                     self.update_icon()
-                    logging.info("Connected to Bridge")
-                    await ws.wait_closed()
-            except Exception:
-                self.connected = False
-                self.update_icon()
-                # logging.debug("Bridge not reachable")
+            except OSError:
+                pass
+            self.connected = False
+            self.status = {}
+            self.update_icon()
             
-            await asyncio.sleep(2)
+            time.sleep(2)
             
-    def update_icon(self):
-        if self.icon:
-            color = "green" if self.connected else "grey"
-            self.icon.icon = self.create_image(color)
-            self.icon.title = f"SpaceMouse xDesign: {'Connected' if self.connected else 'Disconnected'}"
+    def icon_state(self):
+        if not self.connected:
+            return "disconnected"
+        errors = self.status.get("errors", {})
+        if not self.status.get("spacenavd") or any(errors.get(k, 0) > v for k, v in self.last_errors.items()):
+            return "error"
+        if self.status.get("motion"):
+            return "active"
+        return "connected" if self.status.get("clients") else "idle"
+
+    def perf_lines(self):
+        """Live readout for the menu, from the bridge's once-a-second perf sample."""
+        perf = self.status.get("perf") or {}
+        def ms(v):
+            return f"{v:.1f} ms" if v is not None else "-"
+        return (
+            f"Input: {perf.get('event_rate', 0):.0f} events/s",
+            f"xDesign round trip: {ms(perf.get('rtt_ms'))}",
+            f"Dropped frames: {perf.get('dropped', 0)}/s",
+            f"Key injection: {ms(perf.get('key_ms'))}",
+        )
 
-    def run_monitor(self):
-        asyncio.run(self.check_connection())
+    def update_icon(self):
+        # Only talk to the tray host when what it shows actually changes
+        if not self.icon:
+            return
+        perf = self.perf_lines() if self.connected else None
+        if perf != self.shown_perf:
+            # At most once a second: the bridge samples perf at 1 Hz
+            self.shown_perf = perf
+            self.icon.update_menu()
+        shown = (self.icon_state(), self.status_text())
+        if shown == self.shown:
+            return
+        state, title = shown
+        if state != (self.shown and self.shown[0]):
+            self.icon.icon = self.images[state]
+        self.icon.title = f"SpaceMouse xDesign: {title}"
+        self.shown = shown
+
+    def status_text(self):
+        if not self.connected:
+            return "Disconnected"
+        if not self.status.get("spacenavd"):
+            return "Connected (spacenavd not running)"
+        clients = self.status.get("clients", 0)
+        return f"Connected ({clients} xDesign tab{'s' if clients != 1 else ''})"
 
     def run(self):
         # Start Monitor Thread
-        t = threading.Thread(target=self.run_monitor, daemon=True)
+        t = threading.Thread(target=self.watch_status, daemon=True)
         t.start()
 
         # Build Menu
@@ -114,6 +177,8 @@ class SpaceMouseTray:
             item('Open Configuration', self.on_open_config, default=True),
             item('Status: Connected', lambda i, it: None, enabled=False, visible=lambda i: self.connected),
             item('Status: Disconnected', lambda i, it: None, enabled=False, visible=lambda i: not self.connected),
+            *[item(lambda it, n=n: self.shown_perf[n], lambda i, it: None, enabled=False,
+                   visible=lambda it: self.shown_perf is not None) for n in range(4)],
             pystray.Menu.SEPARATOR,
             item('Restart Service', self.on_restart_service),
             item('Start Service', self.on_start_service, visible=lambda i: not self.connected),
@@ -124,7 +189,7 @@ class SpaceMouseTray:
 
         self.icon = pystray.Icon(
             "spacemouse_tray",
-            self.create_image("grey"),
+            self.images["disconnected"],
             "SpaceMouse xDesign",
             menu
         )
@@ -2,8 +2,46 @@ import logging
 import time
 from evdev import UInput, ecodes as e
 
+def parse_combo(key_str):
+    """
+    Translates a combo string, e.g. "ctrl+1", "f", "space", into evdev key codes.
+    """
+    parts = key_str.lower().split('+')
+    keys = []
+    
+    # Mapping logic
+    for p in parts:
+        if not p: continue
+        if p == "ctrl" or p == "control":
+            keys.append(e.KEY_LEFTCTRL)
+        elif p == "alt":
+            keys.append(e.KEY_LEFTALT)
+        elif p == "shift":
+            keys.append(e.KEY_LEFTSHIFT)
+        elif p == "esc" or p == "escape":
+            keys.append(e.KEY_ESC)
+        elif p == "space":
+            keys.append(e.KEY_SPACE)
+        elif p == "f":
+            keys.append(e.KEY_F)
+        elif p.isdigit():
+            # KEY_0, KEY_1, ...
+            # getattr(e, f"KEY_{p}") usually works
+            k = getattr(e, f"KEY_{p}", None)
+            if k: keys.append(k)
+        else:
+            # Try generic lookup
+            k = getattr(e, f"KEY_{p.upper()}", None)
+            if k: 
+                keys.append(k)
+            else:
+                logging.warning(f"Unknown key in mapping: {p}")
+    return keys
+
+
 class VirtualKeyboard:
     def __init__(self):
+        self.held = set()  # keys pressed and not released yet
         try:
             self.ui = UInput()
             logging.info("Virtual Keyboard Initialized (uinput)")
@@ -22,42 +60,14 @@ class VirtualKeyboard:
         if not key_str:
             return
 
-        parts = key_str.lower().split('+')
-        keys = []
-        
-        # Mapping logic
-        for p in parts:
-            if not p: continue
-            if p == "ctrl" or p == "control":
-                keys.append(e.KEY_LEFTCTRL)
-            elif p == "alt":
-                keys.append(e.KEY_LEFTALT)
-            elif p == "shift":
-                keys.append(e.KEY_LEFTSHIFT)
-            elif p == "esc" or p == "escape":
-                keys.append(e.KEY_ESC)
-            elif p == "space":
-                keys.append(e.KEY_SPACE)
-            elif p == "f":
-                keys.append(e.KEY_F)
-            elif p.isdigit():
-                # KEY_0, KEY_1, ...
-                # getattr(e, f"KEY_{p}") usually works
-                k = getattr(e, f"KEY_{p}", None)
-                if k: keys.append(k)
-            else:
-                # Try generic lookup
-                k = getattr(e, f"KEY_{p.upper()}", None)
-                if k: 
-                    keys.append(k)
-                else:
-                    logging.warning(f"Unknown key in mapping: {p}")
+        keys = parse_combo(key_str)
 
         # Execute
         try:
             # Hold modifiers
             for k in keys:
                 self.ui.write(e.EV_KEY, k, 1)
+                self.held.add(k)
             self.ui.syn()
             
             # Short delay for the OS to register the keystroke
@@ -66,11 +76,27 @@ class VirtualKeyboard:
             # Release all (LIFO/FIFO doesn't strictly matter for release but usually reverse)
             for k in reversed(keys):
                 self.ui.write(e.EV_KEY, k, 0)
+                self.held.discard(k)
             self.ui.syn()
             
         except Exception as err:
             logging.error(f"Failed to press keys: {err}")
+            self.release_all()
+
+    def release_all(self):
+        """Release keys still held down, so no modifier stays stuck in the desktop session."""
+        if not self.ui or not self.held:
+            return
+        try:
+            for k in self.held:
+                self.ui.write(e.EV_KEY, k, 0)
+            self.ui.syn()
+        except Exception as err:
+            logging.error(f"Failed to release keys: {err}")
+        self.held.clear()
 
     def close(self):
         if self.ui:
+            self.release_all()
             self.ui.close()
+            self.ui = None